@@ -1,51 +1,144 @@
-from fastapi import HTTPException, Header
-from typing import Optional
+from fastapi import HTTPException, Header, Depends, Request
+from typing import Any, Dict, Optional, Tuple
+import asyncio
 import logging
 import jwt
-import requests
 import os
 import time
+import base64
+import hashlib
+import orjson
+from collections import OrderedDict
+
+from config import VERIFY_SIGNATURES
+from database import get_database
 
 logger = logging.getLogger(__name__)
 
-# Cache JWKS keys to avoid fetching on every request
-_jwks_cache = {"keys": None, "fetched_at": 0}
+# Single JWKS client used only to fetch the key set; the last good set is
+# kept here by `kid` so verifies are local, and it keeps being served when a
+# refresh fails. Fetches run in a worker thread, never on the event loop.
+_jwks_client: Optional[jwt.PyJWKClient] = None
+_signing_keys: Dict[str, Any] = {}
+_jwks_fetched_at = 0.0
+_jwks_attempted_at = float("-inf")
+_jwks_lock = asyncio.Lock()
 _JWKS_CACHE_TTL = 3600  # Re-fetch JWKS every hour
+_JWKS_MIN_REFRESH_INTERVAL = 30  # Unknown kids or outages retry at most this often
 
+# Cache verified token claims so repeat bearers skip the RSA verify + decode.
+# Entries are only stored after full signature validation, and expire with
+# the token's own `exp` claim, so no new trust is created here.
+_token_cache: "OrderedDict[bytes, tuple[dict, float]]" = OrderedDict()
+_TOKEN_CACHE_MAX_SIZE = 4096
+_TOKEN_EXP_SKEW = 30  # Treat tokens as expired 30s early
 
-def _get_jwks_keys(jwks_url: str) -> dict:
-    """Fetch and cache JWKS keys from Clerk."""
-    now = time.time()
-    if _jwks_cache["keys"] and (now - _jwks_cache["fetched_at"]) < _JWKS_CACHE_TTL:
-        return _jwks_cache["keys"]
 
-    try:
-        response = requests.get(jwks_url, timeout=10)
-        response.raise_for_status()
-        jwks_data = response.json()
-        _jwks_cache["keys"] = jwks_data
-        _jwks_cache["fetched_at"] = now
+def _token_cache_key(token: str) -> bytes:
+    """Hash the raw token so the cache never holds bearer credentials."""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+def _get_cached_claims(cache_key: bytes) -> Optional[dict]:
+    """Return cached claims for a token if they are still valid."""
+    entry = _token_cache.get(cache_key)
+    if entry is None:
+        return None
+
+    decoded, exp = entry
+    if time.time() >= exp - _TOKEN_EXP_SKEW:
+        _token_cache.pop(cache_key, None)
+        return None
+
+    _token_cache.move_to_end(cache_key)
+    return decoded
+
+
+def _cache_claims(cache_key: bytes, decoded: dict) -> None:
+    """Store verified claims, evicting the least recently used entries."""
+    exp = decoded.get("exp")
+    if not exp:
+        return
+
+    _token_cache[cache_key] = (decoded, float(exp))
+    _token_cache.move_to_end(cache_key)
+    while len(_token_cache) > _TOKEN_CACHE_MAX_SIZE:
+        _token_cache.popitem(last=False)
+
+
+def _get_jwks_client() -> jwt.PyJWKClient:
+    """Create the JWKS client once from CLERK_JWKS_URL."""
+    global _jwks_client
+    if _jwks_client is None:
+        jwks_url = os.environ.get('CLERK_JWKS_URL')
+        if not jwks_url:
+            raise HTTPException(status_code=500, detail="Clerk JWKS URL not configured")
+        _jwks_client = jwt.PyJWKClient(jwks_url, cache_jwk_set=False, timeout=10)
+        logger.info("JWKS client initialized")
+    return _jwks_client
+
+
+async def _refresh_signing_keys() -> None:
+    """Re-fetch the key set, keeping the last good one if the fetch fails."""
+    global _signing_keys, _jwks_fetched_at, _jwks_attempted_at
+    async with _jwks_lock:
+        now = time.monotonic()
+        if now - _jwks_attempted_at < _JWKS_MIN_REFRESH_INTERVAL:
+            return  # Another request just refreshed (or just failed to)
+        _jwks_attempted_at = now
+
+        try:
+            keys = await asyncio.to_thread(_get_jwks_client().get_signing_keys)
+        except jwt.PyJWKClientError as e:
+            if not _signing_keys:
+                raise
+            logger.warning(f"JWKS refresh failed, using stale keys: {e}")
+            return
+
+        _signing_keys = {key.key_id: key.key for key in keys}
+        _jwks_fetched_at = now
         logger.info("JWKS keys fetched and cached successfully")
-        return jwks_data
-    except requests.RequestException as e:
-        logger.error(f"Failed to fetch JWKS keys: {e}")
-        # Return cached keys if available, even if stale
-        if _jwks_cache["keys"]:
-            logger.warning("Using stale JWKS cache")
-            return _jwks_cache["keys"]
-        raise HTTPException(status_code=500, detail="Failed to fetch authentication keys")
 
 
-def _get_signing_key(jwks_data: dict, token: str):
-    """Extract the correct signing key from JWKS for the given token."""
-    unverified_header = jwt.get_unverified_header(token)
-    kid = unverified_header.get("kid")
+async def _get_signing_key(token: str):
+    """Resolve the token's signing key by `kid`, refreshing when stale or unknown."""
+    kid = jwt.get_unverified_header(token).get("kid")
+    if kid not in _signing_keys or time.monotonic() - _jwks_fetched_at >= _JWKS_CACHE_TTL:
+        await _refresh_signing_keys()
+
+    key = _signing_keys.get(kid)
+    if key is None:
+        if not _signing_keys:
+            raise HTTPException(status_code=500, detail="Failed to fetch authentication keys")
+        raise HTTPException(status_code=401, detail="Unable to find matching signing key")
+    return key
+
+
+def _fast_unverified_claims(token: str) -> Optional[dict]:
+    """Decode the JWT payload without verification (VERIFY_SIGNATURES=false only)."""
+    try:
+        _, payload_b64, _ = token.split(".")
+        pad = "=" * (-len(payload_b64) % 4)
+        return orjson.loads(base64.urlsafe_b64decode(payload_b64 + pad))
+    except Exception:
+        return None
+
 
-    for key in jwks_data.get("keys", []):
-        if key.get("kid") == kid:
-            return jwt.algorithms.RSAAlgorithm.from_jwk(key)
+def _user_from_claims(decoded: dict) -> dict:
+    """Build the current-user payload; `user_id` is the normalized id key."""
+    return {
+        "user_id": decoded["sub"],
+        "clerk_id": decoded["sub"],
+        "token_data": decoded
+    }
 
-    raise HTTPException(status_code=401, detail="Unable to find matching signing key")
+
+async def prefetch_jwks() -> None:
+    """Warm the JWKS cache so the first request doesn't pay for the fetch."""
+    if not VERIFY_SIGNATURES:
+        logger.warning("VERIFY_SIGNATURES is disabled - Clerk tokens are not verified")
+        return
+    await _refresh_signing_keys()
 
 
 async def verify_clerk_token(authorization: str):
@@ -55,14 +148,20 @@ async def verify_clerk_token(authorization: str):
 
     token = authorization.split(" ")[1]
 
-    try:
-        jwks_url = os.environ.get('CLERK_JWKS_URL')
-        if not jwks_url:
-            raise HTTPException(status_code=500, detail="Clerk JWKS URL not configured")
+    cache_key = _token_cache_key(token)
+    cached = _get_cached_claims(cache_key)
+    if cached is not None:
+        return _user_from_claims(cached)
 
-        # Fetch JWKS and get the correct signing key
-        jwks_data = _get_jwks_keys(jwks_url)
-        signing_key = _get_signing_key(jwks_data, token)
+    if not VERIFY_SIGNATURES:
+        decoded = _fast_unverified_claims(token)
+        if not decoded or not decoded.get("sub"):
+            raise HTTPException(status_code=401, detail="Invalid token")
+        return _user_from_claims(decoded)
+
+    try:
+        # Resolve the signing key by `kid` from the cached key set
+        signing_key = await _get_signing_key(token)
 
         # Decode WITH full signature verification
         decoded = jwt.decode(
@@ -75,16 +174,18 @@ async def verify_clerk_token(authorization: str):
                 "verify_aud": False,  # Clerk tokens may not have aud
             },
         )
-        clerk_id = decoded.get('sub')
-
-        if not clerk_id:
+        if not decoded.get('sub'):
             raise HTTPException(status_code=401, detail="Invalid token")
 
-        return {
-            "clerk_id": clerk_id,
-            "token_data": decoded
-        }
+        _cache_claims(cache_key, decoded)
+
+        return _user_from_claims(decoded)
 
+    except jwt.PyJWKClientConnectionError as e:
+        logger.error(f"Failed to fetch JWKS keys: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch authentication keys")
+    except jwt.PyJWKClientError:
+        raise HTTPException(status_code=401, detail="Unable to find matching signing key")
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
@@ -103,4 +204,37 @@ async def get_current_user(authorization: Optional[str] = Header(None)):
     try:
         return await verify_clerk_token(authorization)
     except HTTPException:
-        return None
\ No newline at end of file
+        return None
+
+
+async def get_current_user_and_doc(
+    request: Request,
+    current_user: Optional[dict] = Depends(get_current_user)
+) -> Tuple[Optional[dict], Optional[dict]]:
+    """
+    Current user plus their Mongo user document (only `_id` is loaded).
+
+    The document is looked up at most once per request and kept on
+    `request.state.user_doc`; it is None for anonymous or unsynced users.
+    """
+    if not current_user:
+        return None, None
+
+    if not hasattr(request.state, "user_doc"):
+        db = await get_database()
+        request.state.user_doc = await db.users.find_one(
+            {"clerk_id": current_user["clerk_id"]}, projection={"_id": 1}
+        )
+    return current_user, request.state.user_doc
+
+
+async def get_current_user_doc(
+    user_and_doc: Tuple[Optional[dict], Optional[dict]] = Depends(get_current_user_and_doc)
+) -> dict:
+    """Mongo user document for routes that need a synced user (404 otherwise)"""
+    current_user, user_doc = user_and_doc
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Authentication required")
+    if not user_doc:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user_doc
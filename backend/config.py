@@ -42,6 +42,8 @@ LLM_MAX_TOKENS_SIMULATION = int(os.getenv("LLM_MAX_TOKENS_SIMULATION", "3000"))
 LLM_MAX_TOKENS_NARRATIVE = int(os.getenv("LLM_MAX_TOKENS_NARRATIVE", "500"))
 LLM_MAX_TOKENS_COMPARISON = int(os.getenv("LLM_MAX_TOKENS_COMPARISON", "400"))
 LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "45.0"))
+LLM_RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("LLM_RESPONSE_CACHE_TTL_SECONDS", "86400"))
+LLM_MAX_CONCURRENCY = int(os.getenv("OPENROUTER_MAX_CONCURRENCY", "10"))
 
 # ML Model Paths
 
@@ -87,3 +89,6 @@ DATABASE_NAME = os.getenv("DATABASE_NAME", "parallax")
 ENABLE_ML_PREDICTIONS = os.getenv("ENABLE_ML_PREDICTIONS", "true").lower() == "true"
 ENABLE_AI_NARRATIVES = os.getenv("ENABLE_AI_NARRATIVES", "true").lower() == "true"
 DEBUG_MODE = os.getenv("DEBUG_MODE", "false").lower() == "true"
+
+# Set to false only for local development without Clerk keys
+VERIFY_SIGNATURES = os.getenv("VERIFY_SIGNATURES", "true").lower() == "true"
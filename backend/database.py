@@ -1,65 +1,128 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from bson import ObjectId
+from bson.codec_options import CodecOptions, TypeDecoder, TypeRegistry
+from pymongo import ASCENDING, DESCENDING, IndexModel
+import asyncio
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 
 mongo_url = os.getenv('MONGO_URL', os.getenv('MONGODB_URL', 'mongodb://localhost:27017'))
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.getenv('DB_NAME', os.getenv('DATABASE_NAME', 'parallax'))]
+db_name = os.getenv('DB_NAME', os.getenv('DATABASE_NAME', 'parallax'))
+
+# Single client/pool per process, created on first use
+client = None
+db = None
+_db_lock = asyncio.Lock()
+
+# Connection pool settings
+MONGO_MAX_POOL = int(os.getenv("MONGO_MAX_POOL", "50"))
+MONGO_MIN_POOL = int(os.getenv("MONGO_MIN_POOL", "10"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_MAX_CONNECTING = int(os.getenv("MONGO_MAX_CONNECTING", "4"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+
+# Wire-protocol compression (MongoDB 4.2+); zlib is the stdlib fallback
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib")
+
+
+class _ObjectIdAsString(TypeDecoder):
+    """Decode ObjectIds straight to str so documents are JSON-ready."""
+    bson_type = ObjectId
+
+    def transform_bson(self, value):
+        return str(value)
+
+
+# Applied to the whole database: no code path sends a decoded _id back to
+# Mongo as an ObjectId, so routes can return documents as read
+_CODEC_OPTIONS = CodecOptions(type_registry=TypeRegistry([_ObjectIdAsString()]))
+
+# Indexes per collection, created with one createIndexes command each
+_INDEXES = {
+    "users": [
+        IndexModel("clerk_id", unique=True),
+        IndexModel("email"),
+        IndexModel("created_at"),
+    ],
+    "simulations": [
+        IndexModel("user_id"),
+        IndexModel("created_at"),
+        IndexModel("id", unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "payment_transactions": [
+        IndexModel("session_id", unique=True),
+        IndexModel("user_id"),
+        IndexModel("created_at"),
+        IndexModel("payment_status"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "subscriptions": [
+        IndexModel("user_id"),
+        IndexModel("id", unique=True),
+        IndexModel("stripe_subscription_id"),
+        IndexModel("status"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel("current_period_end"),
+    ],
+    "usage_tracking": [
+        IndexModel("user_id"),
+        IndexModel("subscription_id"),
+        IndexModel("id", unique=True),
+        IndexModel([("user_id", ASCENDING), ("period_start", ASCENDING), ("period_end", ASCENDING)]),
+    ],
+    "custom_scenarios": [
+        IndexModel("user_id"),
+        IndexModel("id", unique=True),
+        IndexModel("is_public"),
+        IndexModel("created_at"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("is_public", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "feedback": [
+        IndexModel("user_id"),
+        IndexModel("id", unique=True),
+        IndexModel("type"),
+        IndexModel("priority"),
+        IndexModel("created_at"),
+    ],
+}
 
 async def get_database():
     """Get database connection"""
+    global client, db
+    if db is not None:
+        return db
+
+    async with _db_lock:
+        if db is None:
+            client = AsyncIOMotorClient(
+                mongo_url,
+                maxPoolSize=MONGO_MAX_POOL,
+                minPoolSize=MONGO_MIN_POOL,
+                maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                maxConnecting=MONGO_MAX_CONNECTING,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                compressors=MONGO_COMPRESSORS,
+                zlibCompressionLevel=-1,
+            )
+            db = client.get_database(db_name, codec_options=_CODEC_OPTIONS)
     return db
 
 async def init_database():
     """Initialize database with indexes"""
     try:
-        
-        # Indexes
-        # Users collection indexes
-        await db.users.create_index("clerk_id", unique=True)
-        await db.users.create_index("email")
-        await db.users.create_index("created_at")
-        
-        # Simulations
-        await db.simulations.create_index("user_id")
-        await db.simulations.create_index("created_at")
-        await db.simulations.create_index("id", unique=True)
-        await db.simulations.create_index([("user_id", 1), ("created_at", -1)])
-        
-        # Payment transactions
-        await db.payment_transactions.create_index("session_id", unique=True)
-        await db.payment_transactions.create_index("user_id")
-        await db.payment_transactions.create_index("created_at")
-        await db.payment_transactions.create_index("payment_status")
-
-        # Subscriptions
-        await db.subscriptions.create_index("user_id")
-        await db.subscriptions.create_index("id", unique=True)
-        await db.subscriptions.create_index("stripe_subscription_id")
-        await db.subscriptions.create_index("status")
-        await db.subscriptions.create_index([("user_id", 1), ("created_at", -1)])
-        await db.subscriptions.create_index("current_period_end")
-
-        # Usage tracking
-        await db.usage_tracking.create_index("user_id")
-        await db.usage_tracking.create_index("subscription_id")
-        await db.usage_tracking.create_index("id", unique=True)
-        await db.usage_tracking.create_index([("user_id", 1), ("period_start", 1), ("period_end", 1)])
-
-        # Custom scenarios
-        await db.custom_scenarios.create_index("user_id")
-        await db.custom_scenarios.create_index("id", unique=True)
-        await db.custom_scenarios.create_index("is_public")
-        await db.custom_scenarios.create_index("created_at")
-
-        # Feedback
-        await db.feedback.create_index("user_id")
-        await db.feedback.create_index("id", unique=True)
-        await db.feedback.create_index("type")
-        await db.feedback.create_index("priority")
-        await db.feedback.create_index("created_at")
+        db = await get_database()
+
+        # Open the pool eagerly so the first requests don't pay for handshakes
+        await db.command("ping")
+
+        await asyncio.gather(*(
+            db[collection].create_indexes(indexes)
+            for collection, indexes in _INDEXES.items()
+        ))
 
         logger.info("Database indexes created successfully")
         
@@ -68,4 +131,8 @@ async def init_database():
 
 async def close_database():
     """Close database connection"""
-    client.close()
\ No newline at end of file
+    global client, db
+    if client is not None:
+        client.close()
+        client = None
+        db = None
@@ -1,10 +1,10 @@
-from fastapi import HTTPException, Depends
+from fastapi import HTTPException, Depends, Request
 from typing import Optional, Callable
 from functools import wraps
 import logging
 
 from auth import get_current_user
-from services.subscription_service import SubscriptionService
+from services.subscription_service import SubscriptionService, UsageDecision
 
 logger = logging.getLogger(__name__)
 
@@ -16,24 +16,57 @@ class PremiumRequired(Exception):
         self.tier = tier
         super().__init__(self.message)
 
-async def require_premium_subscription(
-    current_user: Optional[dict] = Depends(get_current_user)
-):
-    """Dependency that requires premium subscription"""
+def _require_user_id(current_user: Optional[dict]) -> str:
+    """Validate the authenticated user and return their id"""
     if not current_user:
         raise HTTPException(
             status_code=401,
-            detail="Authentication required for premium features"
+            detail="Authentication required"
         )
 
-    user_id = current_user.get("id") or current_user.get("clerk_id")
+    user_id = current_user.get("user_id")
     if not user_id:
         raise HTTPException(
             status_code=401,
             detail="Invalid user session"
         )
+    return user_id
+
+async def _cached_subscription(user_id: str, request: Optional[Request] = None):
+    """Get the user's subscription once per request (and per cache TTL)"""
+    if request is not None:
+        subscription = getattr(request.state, "subscription", None)
+        if subscription is not None and subscription.user_id == user_id:
+            return subscription
+
+    subscription = await SubscriptionService.get_cached_subscription(user_id)
+
+    if request is not None:
+        request.state.subscription = subscription
+    return subscription
+
+def _access_denied(error: str, feature: str, decision: UsageDecision, **extra) -> HTTPException:
+    """Build the 403 for a denied usage decision (only on the denied path)"""
+    return HTTPException(
+        status_code=403,
+        detail={
+            "error": error,
+            "message": decision.reason,
+            "feature": feature,
+            "tier": decision.tier,
+            "usage_info": decision.usage_info or {},
+            **extra
+        }
+    )
+
+async def require_premium_subscription(
+    request: Request,
+    current_user: Optional[dict] = Depends(get_current_user)
+):
+    """Dependency that requires premium subscription"""
+    user_id = _require_user_id(current_user)
 
-    subscription = await SubscriptionService.get_user_subscription(user_id)
+    subscription = await _cached_subscription(user_id, request)
 
     if not subscription.has_premium_access():
         raise HTTPException(
@@ -51,165 +84,106 @@ async def require_premium_subscription(
 
 async def require_feature_access(
     feature: str,
-    current_user: Optional[dict] = Depends(get_current_user)
+    current_user: Optional[dict] = Depends(get_current_user),
+    request: Optional[Request] = None
 ):
     """Dependency factory for specific feature access control"""
-    if not current_user:
-        raise HTTPException(
-            status_code=401,
-            detail="Authentication required"
-        )
+    user_id = _require_user_id(current_user)
 
-    user_id = current_user.get("id") or current_user.get("clerk_id")
-    if not user_id:
-        raise HTTPException(
-            status_code=401,
-            detail="Invalid user session"
-        )
+    # Reuse an allowed decision for the same feature within one request
+    decisions = getattr(request.state, "usage_decisions", None) if request is not None else None
+    if decisions and feature in decisions:
+        return current_user
 
-    access_check = await SubscriptionService.check_usage_limits(user_id, feature)
+    decision = await SubscriptionService.check_usage_limits(user_id, feature)
 
-    if not access_check["allowed"]:
-        raise HTTPException(
-            status_code=403,
-            detail={
-                "error": "feature_access_denied",
-                "message": access_check["reason"],
-                "feature": feature,
-                "tier": access_check["tier"],
-                "usage_info": access_check.get("usage_info", {})
-            }
-        )
+    if not decision.allowed:
+        raise _access_denied("feature_access_denied", feature, decision)
+
+    if request is not None:
+        if decisions is None:
+            decisions = request.state.usage_decisions = {}
+        decisions[feature] = decision
 
     return current_user
 
 def premium_feature(feature_name: str):
-    """Decorator for premium feature endpoints"""
+    """Decorator for premium feature endpoints
+
+    The consume_usage call is the access check, so decorated routes only need
+    get_current_user rather than a require_*_access dependency.
+    """
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
             # Extract current_user from kwargs if it exists
-            current_user = kwargs.get('current_user')
-            if not current_user:
-                raise HTTPException(
-                    status_code=401,
-                    detail="Authentication required"
-                )
-
-            user_id = current_user.get("id") or current_user.get("clerk_id")
-            if not user_id:
-                raise HTTPException(
-                    status_code=401,
-                    detail="Invalid user session"
-                )
-
-            access_check = await SubscriptionService.check_usage_limits(user_id, feature_name)
-
-            if not access_check["allowed"]:
-                raise HTTPException(
-                    status_code=403,
-                    detail={
-                        "error": "feature_access_denied",
-                        "message": access_check["reason"],
-                        "feature": feature_name,
-                        "tier": access_check["tier"],
-                        "usage_info": access_check.get("usage_info", {})
-                    }
-                )
-
-            # Record usage after successful access check
+            user_id = _require_user_id(kwargs.get('current_user'))
+
+            decision = await SubscriptionService.consume_usage(user_id, feature_name)
+
+            if not decision.allowed:
+                raise _access_denied("feature_access_denied", feature_name, decision)
+
+            # Usage was recorded by the access check; give it back on failure
             try:
-                result = await func(*args, **kwargs)
-                await SubscriptionService.record_usage(user_id, feature_name)
-                return result
+                return await func(*args, **kwargs)
             except Exception as e:
                 logger.error(f"Error in premium feature {feature_name}: {e}")
+                await SubscriptionService.release_usage(user_id, feature_name)
                 raise
 
         return wrapper
     return decorator
 
 def usage_limited(feature_name: str):
-    """Decorator for usage-limited features"""
+    """Decorator for usage-limited features (checks and records in one call)"""
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            current_user = kwargs.get('current_user')
-            if not current_user:
-                raise HTTPException(
-                    status_code=401,
-                    detail="Authentication required"
-                )
-
-            user_id = current_user.get("id") or current_user.get("clerk_id")
-            if not user_id:
-                raise HTTPException(
-                    status_code=401,
-                    detail="Invalid user session"
-                )
-
-            access_check = await SubscriptionService.check_usage_limits(user_id, feature_name)
-
-            if not access_check["allowed"]:
-                raise HTTPException(
-                    status_code=403,
-                    detail={
-                        "error": "usage_limit_exceeded",
-                        "message": access_check["reason"],
-                        "feature": feature_name,
-                        "tier": access_check["tier"],
-                        "usage_info": access_check.get("usage_info", {}),
-                        "upgrade_required": True
-                    }
-                )
+            user_id = _require_user_id(kwargs.get('current_user'))
+
+            decision = await SubscriptionService.consume_usage(user_id, feature_name)
+
+            if not decision.allowed:
+                raise _access_denied("usage_limit_exceeded", feature_name, decision, upgrade_required=True)
 
             try:
-                result = await func(*args, **kwargs)
-                await SubscriptionService.record_usage(user_id, feature_name)
-                return result
+                return await func(*args, **kwargs)
             except Exception as e:
                 logger.error(f"Error in usage-limited feature {feature_name}: {e}")
+                await SubscriptionService.release_usage(user_id, feature_name)
                 raise
 
         return wrapper
     return decorator
 
 # Specific dependency functions for common features
-async def require_simulation_access(
-    current_user: Optional[dict] = Depends(get_current_user)
-):
-    """Dependency for simulation access with usage limits"""
-    return await require_feature_access("simulation", current_user)
-
 async def require_advanced_simulation_access(
+    request: Request,
     current_user: Optional[dict] = Depends(get_current_user)
 ):
     """Dependency for advanced simulation features"""
-    return await require_feature_access("advanced_simulation", current_user)
+    return await require_feature_access("advanced_simulation", current_user, request)
 
 async def require_ai_chatbot_access(
+    request: Request,
     current_user: Optional[dict] = Depends(get_current_user)
 ):
     """Dependency for AI chatbot access"""
-    return await require_feature_access("ai_chatbot", current_user)
+    return await require_feature_access("ai_chatbot", current_user, request)
 
 async def require_custom_scenario_access(
+    request: Request,
     current_user: Optional[dict] = Depends(get_current_user)
 ):
     """Dependency for custom scenario creation"""
-    return await require_feature_access("custom_scenarios", current_user)
-
-async def require_risk_assessment_access(
-    current_user: Optional[dict] = Depends(get_current_user)
-):
-    """Dependency for risk assessment access with usage limits"""
-    return await require_feature_access("risk_assessment", current_user)
+    return await require_feature_access("custom_scenarios", current_user, request)
 
 # Utility functions for checking access without raising exceptions
 async def check_premium_access(user_id: str) -> bool:
     """Check if user has premium access without raising exceptions"""
     try:
-        subscription = await SubscriptionService.get_user_subscription(user_id)
+        subscription = await _cached_subscription(user_id)
         return subscription.has_premium_access()
     except Exception as e:
         logger.error(f"Error checking premium access for user {user_id}: {e}")
@@ -218,7 +192,8 @@ async def check_premium_access(user_id: str) -> bool:
 async def check_feature_access(user_id: str, feature: str) -> dict:
     """Check feature access and return detailed information"""
     try:
-        return await SubscriptionService.check_usage_limits(user_id, feature)
+        decision = await SubscriptionService.check_usage_limits(user_id, feature)
+        return {**decision._asdict(), "usage_info": decision.usage_info or {}}
     except Exception as e:
         logger.error(f"Error checking feature access for user {user_id}, feature {feature}: {e}")
         return {
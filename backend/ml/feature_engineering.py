@@ -5,7 +5,7 @@ Transforms raw user input into features suitable for ML models.
 """
 
 import numpy as np
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from models.ml_models import (
     MLPredictionInput, CareerField, EducationLevel, LocationType
 )
@@ -23,6 +23,15 @@ from config import (
     ANNUAL_TRAINING_RAISE_RATE,
 )
 
+POSITION_LEVELS = ["entry", "mid", "senior", "lead", "executive"]
+_INV_TYPICAL_PERFORMANCE = 1.0 / 7.0
+
+# Category value -> numeric index, precomputed once instead of list.index() per row
+_EDUCATION_INDEX = {e.value: i for i, e in enumerate(EducationLevel)}
+_CAREER_INDEX = {c.value: i for i, c in enumerate(CareerField)}
+_LOCATION_INDEX = {l.value: i for i, l in enumerate(LocationType)}
+_POSITION_INDEX = {p: i for i, p in enumerate(POSITION_LEVELS)}
+
 class FeatureEngineer:
     """Feature engineering for prediction models"""
 
@@ -126,6 +135,58 @@ class FeatureEngineer:
         "other": 7.0
     }
 
+    # Base stability by career field (string keys)
+    FIELD_STABILITY = {
+        "technology": 7.5,
+        "healthcare": 8.5,
+        "finance": 7.0,
+        "engineering": 8.0,
+        "education": 8.2,
+        "business": 7.0,
+        "creative": 6.0,
+        "service": 5.5,
+        "other": 6.5
+    }
+
+    # Work-life balance adjustments by career field
+    FIELD_WORK_LIFE_ADJUSTMENT = {
+        CareerField.TECHNOLOGY: 0.5,
+        CareerField.HEALTHCARE: -0.5,
+        CareerField.FINANCE: -1.0,
+        CareerField.EDUCATION: 1.0,
+        CareerField.CREATIVE: 0.5,
+    }
+
+    # Base work-life balance by position level
+    LEVEL_WORK_LIFE_BALANCE = {
+        "entry": 7.0,
+        "mid": 6.5,
+        "senior": 6.0,
+        "lead": 5.5,
+        "executive": 4.5
+    }
+
+    # Extra stress by position level
+    LEVEL_STRESS = {
+        "entry": 0,
+        "mid": 0.5,
+        "senior": 1.0,
+        "lead": 2.0,
+        "executive": 3.0
+    }
+
+    # Base promotion rate by position level
+    LEVEL_PROMOTION_RATE = {
+        "entry": 0.25,
+        "mid": 0.15,
+        "senior": 0.10,
+        "lead": 0.05,
+        "executive": 0.02
+    }
+
+    # Career fields that get the remote-work salary bonus
+    REMOTE_BONUS_FIELDS = (CareerField.TECHNOLOGY, CareerField.FINANCE, CareerField.BUSINESS)
+
     @staticmethod
     def _get_key(value) -> str:
         """Convert enum or string to lowercase string key"""
@@ -150,12 +211,12 @@ class FeatureEngineer:
                 base = PROFESSION_SALARIES[input_data.detected_profession].get("entry", 50000)
         else:
             # Use generic career field salary
-            career_key = FeatureEngineer._get_key(input_data.career_field)
-            base = FeatureEngineer.BASE_SALARIES[career_key][input_data.position_level]
+            career_idx = _CAREER_INDEX.get(FeatureEngineer._get_key(input_data.career_field), -1)
+            base = float(_BASE_SALARY[career_idx, _POSITION_INDEX.get(input_data.position_level, -1)])
 
         # Apply education multiplier
-        education_key = FeatureEngineer._get_key(input_data.education_level)
-        education_mult = FeatureEngineer.EDUCATION_SALARY_MULTIPLIER.get(education_key, 1.0)
+        education_idx = _EDUCATION_INDEX.get(FeatureEngineer._get_key(input_data.education_level), -1)
+        education_mult = float(_EDUCATION_MULT[education_idx])
 
         # Apply location multiplier
         location_mult = FeatureEngineer.get_location_multiplier(input_data.location_type)
@@ -164,9 +225,9 @@ class FeatureEngineer:
         experience_mult = 1 + min(EXPERIENCE_MULTIPLIER_CAP, input_data.years_experience * EXPERIENCE_MULTIPLIER_PER_YEAR)
 
         # Remote work bonus for high-demand fields
-        remote_mult = (1 + REMOTE_WORK_SALARY_BONUS) if input_data.has_remote_option and input_data.career_field in [
-            CareerField.TECHNOLOGY, CareerField.FINANCE, CareerField.BUSINESS
-        ] else 1.0
+        remote_mult = (1 + REMOTE_WORK_SALARY_BONUS) if (
+            input_data.has_remote_option and input_data.career_field in FeatureEngineer.REMOTE_BONUS_FIELDS
+        ) else 1.0
 
         salary = base * education_mult * location_mult * experience_mult * remote_mult
 
@@ -237,21 +298,8 @@ class FeatureEngineer:
     @staticmethod
     def calculate_career_stability(input_data: MLPredictionInput) -> float:
         """Calculate career stability score (1-10)"""
-        # Base stability by field (string keys)
-        stability_map = {
-            "technology": 7.5,
-            "healthcare": 8.5,
-            "finance": 7.0,
-            "engineering": 8.0,
-            "education": 8.2,
-            "business": 7.0,
-            "creative": 6.0,
-            "service": 5.5,
-            "other": 6.5
-        }
-
-        career_key = FeatureEngineer._get_key(input_data.career_field)
-        stability = stability_map.get(career_key, 6.5)
+        career_idx = _CAREER_INDEX.get(FeatureEngineer._get_key(input_data.career_field), -1)
+        stability = float(_FIELD_STABILITY[career_idx])
 
         # Career change reduces stability temporarily
         if input_data.is_career_change:
@@ -268,8 +316,8 @@ class FeatureEngineer:
     @staticmethod
     def calculate_job_satisfaction(input_data: MLPredictionInput, work_life_balance: float) -> float:
         """Calculate job satisfaction score (1-10)"""
-        career_key = FeatureEngineer._get_key(input_data.career_field)
-        base_satisfaction = FeatureEngineer.FIELD_SATISFACTION.get(career_key, 7.0)
+        career_idx = _CAREER_INDEX.get(FeatureEngineer._get_key(input_data.career_field), -1)
+        base_satisfaction = float(_FIELD_SATISFACTION[career_idx])
 
         # Work-life balance strongly affects satisfaction
         satisfaction = base_satisfaction * 0.6 + work_life_balance * 0.4
@@ -291,30 +339,14 @@ class FeatureEngineer:
     @staticmethod
     def calculate_work_life_balance(input_data: MLPredictionInput) -> float:
         """Calculate work-life balance score (1-10)"""
-        # Base by position level
-        level_balance = {
-            "entry": 7.0,
-            "mid": 6.5,
-            "senior": 6.0,
-            "lead": 5.5,
-            "executive": 4.5
-        }
-
-        balance = level_balance.get(input_data.position_level, 6.0)
+        balance = float(_LEVEL_WORK_LIFE_BALANCE[_POSITION_INDEX.get(input_data.position_level, -1)])
 
         # Remote work significantly improves work-life balance
         if input_data.has_remote_option:
             balance += 1.5
 
         # Career field adjustments
-        field_adjustments = {
-            CareerField.TECHNOLOGY: 0.5,
-            CareerField.HEALTHCARE: -0.5,
-            CareerField.FINANCE: -1.0,
-            CareerField.EDUCATION: 1.0,
-            CareerField.CREATIVE: 0.5,
-        }
-        balance += field_adjustments.get(input_data.career_field, 0)
+        balance += FeatureEngineer.FIELD_WORK_LIFE_ADJUSTMENT.get(input_data.career_field, 0)
 
         return max(1.0, min(10.0, balance))
 
@@ -325,14 +357,7 @@ class FeatureEngineer:
         base_stress = 10 - work_life_balance
 
         # Position level increases stress
-        level_stress = {
-            "entry": 0,
-            "mid": 0.5,
-            "senior": 1.0,
-            "lead": 2.0,
-            "executive": 3.0
-        }
-        stress = base_stress + level_stress.get(input_data.position_level, 0)
+        stress = base_stress + float(_LEVEL_STRESS[_POSITION_INDEX.get(input_data.position_level, -1)])
 
         # Career/location changes add temporary stress
         if input_data.is_career_change:
@@ -349,30 +374,58 @@ class FeatureEngineer:
         performance_score: float
     ) -> float:
         """Calculate probability of promotion in a given year"""
+        base_prob, growth_factor = FeatureEngineer.promotion_factors(input_data)
+        return FeatureEngineer.promotion_probability_from_factors(
+            base_prob, growth_factor, years_in_position, performance_score
+        )
+
+    @staticmethod
+    def promotion_factors(input_data: MLPredictionInput) -> Tuple[float, float]:
+        """Input-only part of the promotion probability: (base rate, growth factor)"""
         # Base promotion rate by position
-        base_rates = {
-            "entry": 0.25,
-            "mid": 0.15,
-            "senior": 0.10,
-            "lead": 0.05,
-            "executive": 0.02
-        }
+        base_prob = float(_LEVEL_PROMOTION_RATE[_POSITION_INDEX.get(input_data.position_level, -1)])
 
-        base_prob = base_rates.get(input_data.position_level, 0.10)
+        # Industry growth affects opportunities
+        growth_factor = 1 + input_data.industry_growth_rate
 
+        return base_prob, growth_factor
+
+    @staticmethod
+    def promotion_probability_from_factors(
+        base_prob: float,
+        growth_factor: float,
+        years_in_position: int,
+        performance_score: float
+    ) -> float:
+        """Promotion probability for a year, given the factors from promotion_factors"""
         # Time in position increases probability
         time_factor = min(1.5, 1 + years_in_position * 0.1)
 
         # Performance affects promotion
-        performance_factor = performance_score / 7.0  # Normalize around 7/10 performance
-
-        # Industry growth affects opportunities
-        growth_factor = 1 + input_data.industry_growth_rate
+        performance_factor = performance_score * _INV_TYPICAL_PERFORMANCE  # Normalize around 7/10 performance
 
         prob = base_prob * time_factor * performance_factor * growth_factor
 
         return max(0.0, min(1.0, prob))
 
+    @staticmethod
+    def promotion_probability_table(
+        base_prob: float,
+        growth_factor: float,
+        performance_scores: np.ndarray
+    ) -> np.ndarray:
+        """
+        Promotion probability for every (year, years in position) pair.
+
+        Row t uses performance_scores[t]; column k is k years in position,
+        with the last column (5) standing for five or more. Same arithmetic
+        as promotion_probability_from_factors, element for element.
+        """
+        time_factor = np.minimum(1.5, 1 + np.arange(6) * 0.1)
+        performance_factor = np.asarray(performance_scores, dtype=float)[:, None] * _INV_TYPICAL_PERFORMANCE
+        prob = base_prob * time_factor * performance_factor * growth_factor
+        return np.clip(prob, 0.0, 1.0)
+
     @staticmethod
     def calculate_financial_security(salary: float, age: int, location_type: LocationType) -> float:
         """Calculate financial security score (1-10)"""
@@ -424,6 +477,176 @@ class FeatureEngineer:
 
         return max(1.0, min(10.0, health))
 
+    @staticmethod
+    def _unpack(inputs: List[MLPredictionInput]) -> Dict[str, np.ndarray]:
+        """
+        Read every field batch scoring needs out of the inputs in one pass.
+
+        Categories become table indexes (-1 for unknown values) and the rest
+        become float/bool columns, one entry per input.
+        """
+        key = FeatureEngineer._get_key
+        rows = [
+            (
+                _EDUCATION_INDEX.get(key(x.education_level), -1),
+                _CAREER_INDEX.get(key(x.career_field), -1),
+                _LOCATION_INDEX.get(key(x.location_type), -1),
+                _POSITION_INDEX.get(x.position_level, -1),
+                x.age,
+                x.years_experience,
+                x.industry_growth_rate,
+                x.current_salary or 0.0,
+                x.has_remote_option,
+                x.is_career_change,
+                x.is_location_change,
+            )
+            for x in inputs
+        ]
+        table = np.array(rows, dtype=np.float64).reshape(-1, 11)
+        indexes = table[:, :4].astype(np.intp)
+        flags = table[:, 8:].astype(np.bool_)
+
+        return {
+            "edu": indexes[:, 0],
+            "career": indexes[:, 1],
+            "loc": indexes[:, 2],
+            "pos": indexes[:, 3],
+            "age": table[:, 4],
+            "years_exp": table[:, 5],
+            "growth": table[:, 6],
+            "current": table[:, 7],
+            "remote": flags[:, 0],
+            "career_change": flags[:, 1],
+            "location_change": flags[:, 2],
+        }
+
+    @staticmethod
+    def batch_features(
+        inputs: List[MLPredictionInput],
+        years_in_position: Optional[np.ndarray] = None,
+        performance_score: Optional[np.ndarray] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Vectorized scoring for a batch of inputs.
+
+        Evaluates the same formulas as the scalar calculate_* methods, but as
+        elementwise NumPy operations over lookup tables indexed by category.
+
+        Args:
+            inputs: Prediction inputs to score
+            years_in_position: Per-input years in position (defaults to 0)
+            performance_score: Per-input performance score (defaults to 7.0)
+
+        Returns:
+            Dict of score name -> array with one entry per input
+        """
+        n = len(inputs)
+        cols = FeatureEngineer._unpack(inputs)
+        edu, career, loc, pos = cols["edu"], cols["career"], cols["loc"], cols["pos"]
+        age, years_exp, growth, current = cols["age"], cols["years_exp"], cols["growth"], cols["current"]
+        remote, career_change, location_change = cols["remote"], cols["career_change"], cols["location_change"]
+
+        if years_in_position is None:
+            years_in_position = np.zeros(n)
+        if performance_score is None:
+            performance_score = np.full(n, 7.0)
+
+        # Base salary: career/level table, overridden by detected professions.
+        # Salaries stay float64 so rounding to cents matches the scalar path.
+        base = _BASE_SALARY[career, pos]
+        for i, x in enumerate(inputs):
+            profession = x.detected_profession
+            if profession and profession in PROFESSION_SALARIES:
+                base[i] = (
+                    get_profession_salary(profession, x.position_level)
+                    or PROFESSION_SALARIES[profession].get("entry", 50000)
+                )
+
+        salary = (
+            base
+            * _EDUCATION_MULT[edu]
+            * _LOCATION_MULT[loc]
+            * (1 + np.minimum(EXPERIENCE_MULTIPLIER_CAP, years_exp * EXPERIENCE_MULTIPLIER_PER_YEAR))
+            * np.where(remote & _REMOTE_BONUS_FIELD[career], 1 + REMOTE_WORK_SALARY_BONUS, 1.0)
+        )
+        salary = np.round(np.where(current > 0, salary * 0.7 + current * 0.3, salary), 2)
+
+        adjusted_salary = salary / _LOCATION_MULT[loc]
+        base_security = np.select(
+            [adjusted_salary < 40000, adjusted_salary < 60000, adjusted_salary < 90000, adjusted_salary < 150000],
+            [3.0, 5.0, 7.0, 8.5],
+            default=9.5,
+        ).astype(np.float32)
+
+        # The 1-10 scores (and promotion probability) are computed in float32:
+        # half the memory traffic per element, and plenty of precision for them
+        f32 = np.float32
+        age = age.astype(f32)
+        years_exp = years_exp.astype(f32)
+        growth = growth.astype(f32)
+        years_in_position = np.asarray(years_in_position, dtype=f32)
+        performance_score = np.asarray(performance_score, dtype=f32)
+        career_change_penalty = career_change.astype(f32)
+        location_change_penalty = location_change.astype(f32)
+        remote_bonus = remote.astype(f32)
+
+        stability = (
+            _FIELD_STABILITY_F32[career]
+            - career_change_penalty * f32(2.0)
+            + np.minimum(f32(2.0), years_exp * f32(0.1))
+            + growth * f32(10)
+        )
+
+        balance = np.clip(
+            _LEVEL_WORK_LIFE_BALANCE_F32[pos] + remote_bonus * f32(1.5) + _FIELD_WORK_LIFE_ADJUSTMENT_F32[career],
+            f32(1.0), f32(10.0),
+        )
+
+        satisfaction = (
+            _FIELD_SATISFACTION_F32[career] * f32(0.6)
+            + balance * f32(0.4)
+            + remote_bonus * f32(0.5)
+            - career_change_penalty
+            - location_change_penalty * f32(0.5)
+        )
+
+        stress = np.clip(
+            f32(10) - balance
+            + _LEVEL_STRESS_F32[pos]
+            + career_change_penalty * f32(2.0)
+            + location_change_penalty * f32(1.5),
+            f32(1.0), f32(10.0),
+        )
+
+        promotion = (
+            _LEVEL_PROMOTION_RATE_F32[pos]
+            * np.minimum(f32(1.5), f32(1) + years_in_position * f32(0.1))
+            * (performance_score * f32(_INV_TYPICAL_PERFORMANCE))
+            * (f32(1) + growth)
+        )
+
+        financial_security = np.clip(
+            base_security * np.minimum(f32(1.3), f32(0.7) + age * f32(0.01)), f32(1.0), f32(10.0)
+        )
+
+        health = (
+            np.maximum(f32(5.0), f32(10) - (age - f32(30)) * f32(0.05)) * f32(0.4)
+            + (f32(10) - stress) * f32(0.3)
+            + balance * f32(0.2)
+            + financial_security * f32(0.1)
+        )
+
+        return {
+            "base_salary": salary,
+            "career_stability": np.clip(stability, f32(1.0), f32(10.0)),
+            "work_life_balance": balance,
+            "job_satisfaction": np.clip(satisfaction, f32(1.0), f32(10.0)),
+            "stress_level": stress,
+            "promotion_probability": np.clip(promotion, f32(0.0), f32(1.0)),
+            "financial_security": financial_security,
+            "health_score": np.clip(health, f32(1.0), f32(10.0)),
+        }
+
     @staticmethod
     def encode_categorical_features(input_data: MLPredictionInput) -> Dict[str, Any]:
         """One-hot encode categorical features for ML models"""
@@ -432,29 +655,22 @@ class FeatureEngineer:
         career_val = FeatureEngineer._get_key(input_data.career_field)
         location_val = FeatureEngineer._get_key(input_data.location_type)
 
-        # Define enum value lists for numeric encoding
-        education_levels = ["high_school", "associates", "bachelors", "masters", "phd", "bootcamp", "self_taught"]
-        career_fields = ["technology", "healthcare", "finance", "education", "engineering", "business", "creative", "service", "other"]
-        location_types = ["major_city", "suburb", "small_city", "rural", "international"]
-
         features = {
             # Education level encoding
             "education_level": education_val,
-            "education_numeric": education_levels.index(education_val) if education_val in education_levels else 2,
+            "education_numeric": _EDUCATION_INDEX.get(education_val, 2),
 
             # Career field encoding
             "career_field": career_val,
-            "career_numeric": career_fields.index(career_val) if career_val in career_fields else 8,
+            "career_numeric": _CAREER_INDEX.get(career_val, 8),
 
             # Location encoding
             "location_type": location_val,
-            "location_numeric": location_types.index(location_val) if location_val in location_types else 1,
+            "location_numeric": _LOCATION_INDEX.get(location_val, 1),
 
             # Position level encoding
             "position_level": input_data.position_level,
-            "position_numeric": ["entry", "mid", "senior", "lead", "executive"].index(
-                input_data.position_level
-            ) if input_data.position_level in ["entry", "mid", "senior", "lead", "executive"] else 0,
+            "position_numeric": _POSITION_INDEX.get(input_data.position_level, 0),
 
             # Numerical features
             "age": input_data.age,
@@ -466,3 +682,54 @@ class FeatureEngineer:
         }
 
         return features
+
+
+# ---------------------------------------------------------------------------
+# Lookup tables for the FeatureEngineer scoring methods
+# ---------------------------------------------------------------------------
+# Built once from the class dicts above, which remain the source of truth.
+# Each table has one extra trailing slot holding the default for unknown
+# categories, so an index of -1 falls back the way `.get()` used to.
+
+_EDUCATION_MULT = np.array(
+    [FeatureEngineer.EDUCATION_SALARY_MULTIPLIER.get(e.value, 1.0) for e in EducationLevel] + [1.0]
+)
+_LOCATION_MULT = np.array(
+    [LOCATION_MULTIPLIERS.get(l.value, 1.0) for l in LocationType] + [1.0]
+)
+_FIELD_STABILITY = np.array(
+    [FeatureEngineer.FIELD_STABILITY.get(c.value, 6.5) for c in CareerField] + [6.5]
+)
+_FIELD_SATISFACTION = np.array(
+    [FeatureEngineer.FIELD_SATISFACTION.get(c.value, 7.0) for c in CareerField] + [7.0]
+)
+_FIELD_WORK_LIFE_ADJUSTMENT = np.array(
+    [FeatureEngineer.FIELD_WORK_LIFE_ADJUSTMENT.get(c, 0) for c in CareerField] + [0.0]
+)
+_REMOTE_BONUS_FIELD = np.array(
+    [c in FeatureEngineer.REMOTE_BONUS_FIELDS for c in CareerField] + [False]
+)
+_LEVEL_WORK_LIFE_BALANCE = np.array(
+    [FeatureEngineer.LEVEL_WORK_LIFE_BALANCE[p] for p in POSITION_LEVELS] + [6.0]
+)
+_LEVEL_STRESS = np.array(
+    [FeatureEngineer.LEVEL_STRESS[p] for p in POSITION_LEVELS] + [0.0]
+)
+_LEVEL_PROMOTION_RATE = np.array(
+    [FeatureEngineer.LEVEL_PROMOTION_RATE[p] for p in POSITION_LEVELS] + [0.10]
+)
+# Unknown fields use the "other" row, unknown levels the "entry" column
+_BASE_SALARY = np.array(
+    [[FeatureEngineer.BASE_SALARIES[c.value][p] for p in POSITION_LEVELS] + [FeatureEngineer.BASE_SALARIES[c.value]["entry"]]
+     for c in CareerField]
+    + [[FeatureEngineer.BASE_SALARIES["other"][p] for p in POSITION_LEVELS] + [FeatureEngineer.BASE_SALARIES["other"]["entry"]]],
+    dtype=np.float64,
+)
+
+# float32 copies of the score tables for the batch path (see batch_features)
+_FIELD_STABILITY_F32 = _FIELD_STABILITY.astype(np.float32)
+_FIELD_SATISFACTION_F32 = _FIELD_SATISFACTION.astype(np.float32)
+_FIELD_WORK_LIFE_ADJUSTMENT_F32 = _FIELD_WORK_LIFE_ADJUSTMENT.astype(np.float32)
+_LEVEL_WORK_LIFE_BALANCE_F32 = _LEVEL_WORK_LIFE_BALANCE.astype(np.float32)
+_LEVEL_STRESS_F32 = _LEVEL_STRESS.astype(np.float32)
+_LEVEL_PROMOTION_RATE_F32 = _LEVEL_PROMOTION_RATE.astype(np.float32)
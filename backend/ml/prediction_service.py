@@ -6,12 +6,11 @@ for salary and feature engineering for life-quality metrics.
 """
 
 import logging
-import random
 import joblib
+from collections import OrderedDict
 import numpy as np
-import pandas as pd
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 
 from models.ml_models import (
@@ -31,6 +30,88 @@ from ml.profession_data import (
 logger = logging.getLogger(__name__)
 
 POSITION_LEVELS = ["entry", "mid", "senior", "lead", "executive"]
+_TIMELINE_CACHE_MAX_SIZE = 1024
+
+# Happiness = weighted sum of (job satisfaction, financial security, health,
+# relationship quality, personal growth)
+_HAPPINESS_WEIGHTS = np.array([0.25, 0.20, 0.20, 0.20, 0.15])
+_POSITION_INDEX = {level: i for i, level in enumerate(POSITION_LEVELS)}
+
+
+class _FrozenEmptyDict(dict):
+    """Empty dict that refuses mutation and is shared rather than copied"""
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("shared empty events mapping is read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+# Shared result for years where no event clears its threshold. It is stored
+# on the YearlyPrediction as is and serializes like any other dict.
+_EMPTY_EVENTS = _FrozenEmptyDict()
+
+# Generic titles by career field, indexed like POSITION_LEVELS
+_POSITION_TITLES = {
+    CareerField.TECHNOLOGY: (
+        "Software Engineer I", "Software Engineer II",
+        "Senior Software Engineer", "Engineering Manager",
+        "VP of Engineering",
+    ),
+    CareerField.FINANCE: (
+        "Financial Analyst", "Senior Financial Analyst",
+        "Finance Manager", "Director of Finance",
+        "Chief Financial Officer",
+    ),
+    CareerField.HEALTHCARE: (
+        "Healthcare Professional", "Senior Healthcare Professional",
+        "Department Head", "Medical Director",
+        "Chief Medical Officer",
+    ),
+    CareerField.ENGINEERING: (
+        "Engineer I", "Engineer II",
+        "Senior Engineer", "Principal Engineer",
+        "VP of Engineering",
+    ),
+    CareerField.EDUCATION: (
+        "Teacher", "Senior Teacher",
+        "Department Chair", "Assistant Principal",
+        "Principal",
+    ),
+    CareerField.BUSINESS: (
+        "Business Analyst", "Senior Business Analyst",
+        "Business Manager", "Director",
+        "VP of Operations",
+    ),
+    CareerField.CREATIVE: (
+        "Junior Designer", "Designer",
+        "Senior Designer", "Design Lead",
+        "Creative Director",
+    ),
+    CareerField.SERVICE: (
+        "Service Representative", "Senior Service Representative",
+        "Service Manager", "Regional Manager",
+        "Director of Operations",
+    ),
+    CareerField.OTHER: (
+        "Associate", "Senior Associate",
+        "Manager", "Senior Manager",
+        "Director",
+    ),
+}
+
+
+def _round_each(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """Round element-wise with Python's round(), matching the scalar metrics"""
+    return np.array([round(v, ndigits) for v in values.ravel().tolist()]).reshape(values.shape)
 
 
 class MLPredictionService:
@@ -38,13 +119,24 @@ class MLPredictionService:
 
     MODEL_VERSION = "2.0.0-xgboost"
 
-    def __init__(self, models_dir: str = "ml/models"):
+    __slots__ = (
+        "feature_engineer", "_rng", "_timeline_cache", "_models_dir",
+        "_model", "_scaler", "_encoders", "_feature_cols",
+        "_encoder_codes", "_scale_mean", "_scale_std",
+    )
+
+    def __init__(self, models_dir: str = "ml/models", seed: Optional[int] = None):
         self.feature_engineer = FeatureEngineer()
+        self._rng = np.random.default_rng(seed)
+        self._timeline_cache: "OrderedDict[tuple, MLPredictionResult]" = OrderedDict()
         self._models_dir = Path(models_dir)
         self._model = None
         self._scaler = None
         self._encoders = None
         self._feature_cols = None
+        self._encoder_codes = None
+        self._scale_mean = None
+        self._scale_std = None
         self._load_model()
 
     # ------------------------------------------------------------------
@@ -64,6 +156,7 @@ class MLPredictionService:
                 self._scaler = joblib.load(scaler_path)
                 self._encoders = joblib.load(encoders_path)
                 self._feature_cols = joblib.load(feature_cols_path)
+                self._prepare_model_inputs()
                 logger.info("Loaded trained salary model (v2)")
             else:
                 missing = [p.name for p in [model_path, scaler_path, encoders_path, feature_cols_path] if not p.exists()]
@@ -71,6 +164,27 @@ class MLPredictionService:
         except Exception as e:
             logger.error(f"Failed to load salary model: {e}")
 
+    def _prepare_model_inputs(self):
+        """
+        Precompute what each prediction needs from the preprocessing artifacts.
+
+        Label codes become plain dicts and the scaler becomes two arrays, so
+        predictions are built as a NumPy matrix without going through
+        DataFrame construction or sklearn input validation.
+        """
+        self._encoder_codes = {}
+        for col, le in self._encoders.items():
+            codes = {label: i for i, label in enumerate(le.classes_)}
+            # Unseen label — use median encoded value as fallback
+            fallback = int(np.median(np.arange(len(le.classes_))))
+            self._encoder_codes[col] = (codes, fallback)
+
+        n_features = len(self._feature_cols)
+        mean = getattr(self._scaler, "mean_", None)
+        scale = getattr(self._scaler, "scale_", None)
+        self._scale_mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=float)
+        self._scale_std = np.ones(n_features) if scale is None else np.asarray(scale, dtype=float)
+
     @property
     def model_available(self) -> bool:
         return self._model is not None
@@ -79,22 +193,23 @@ class MLPredictionService:
     # Model prediction
     # ------------------------------------------------------------------
 
-    def _predict_salary_with_model(
+    def _predict_salaries_with_model(
         self,
         profession: str,
         career_field: str,
-        position_level: str,
+        position_levels: List[str],
         education_level: str,
         location_type: str,
-        age: int,
-        years_experience: float,
+        ages: np.ndarray,
+        years_experience: np.ndarray,
         has_remote: bool,
         is_career_change: bool,
         industry_growth_rate: float,
-    ) -> Optional[float]:
+    ) -> Optional[np.ndarray]:
         """
-        Predict salary using the trained XGBoost model.
+        Predict salaries for several years in one call to the trained XGBoost model.
 
+        Each year is one row (its own position level, age and experience).
         Returns None if the model is unavailable, allowing the caller
         to fall back to formula-based estimation.
         """
@@ -102,19 +217,20 @@ class MLPredictionService:
             return None
 
         is_training_career = int(profession in TRAINING_CAREERS) if profession else 0
-        in_training = 0
         if is_training_career and profession:
-            tc = TRAINING_CAREERS[profession]
-            in_training = int(years_experience < tc["training_years"])
-
-        row = {
-            "profession": profession or "other",
-            "career_field": career_field,
-            "position_level": position_level,
-            "education_level": education_level,
-            "location_type": location_type,
-            "age": age,
-            "years_experience": round(years_experience, 1),
+            in_training = (years_experience < TRAINING_CAREERS[profession]["training_years"]).astype(int)
+        else:
+            in_training = np.zeros(len(position_levels), dtype=int)
+
+        n = len(position_levels)
+        columns = {
+            "profession": [profession or "other"] * n,
+            "career_field": [career_field] * n,
+            "position_level": position_levels,
+            "education_level": [education_level] * n,
+            "location_type": [location_type] * n,
+            "age": ages,
+            "years_experience": np.round(years_experience, 1),
             "has_remote": int(has_remote),
             "is_career_change": int(is_career_change),
             "is_training_career": is_training_career,
@@ -124,22 +240,16 @@ class MLPredictionService:
 
         # Encode categoricals using the same encoders from training
         for col in ["career_field", "position_level", "education_level", "location_type", "profession"]:
-            le = self._encoders[col]
-            val = row[col]
-            if val in le.classes_:
-                row[col + "_enc"] = le.transform([val])[0]
-            else:
-                # Unseen label — use median encoded value as fallback
-                row[col + "_enc"] = int(np.median(le.transform(le.classes_)))
+            codes, fallback = self._encoder_codes[col]
+            columns[col + "_enc"] = [codes.get(val, fallback) for val in columns[col]]
 
-        features = pd.DataFrame([{c: row[c] for c in self._feature_cols}])
-        features_scaled = pd.DataFrame(
-            self._scaler.transform(features),
-            columns=self._feature_cols,
-        )
+        features = np.empty((n, len(self._feature_cols)))
+        for j, c in enumerate(self._feature_cols):
+            features[:, j] = columns[c]
+        features_scaled = (features - self._scale_mean) / self._scale_std
 
-        prediction = self._model.predict(features_scaled)[0]
-        return max(20000, float(prediction))
+        predictions = self._model.predict(features_scaled)
+        return np.maximum(20000, predictions.astype(float))
 
     # ------------------------------------------------------------------
     # Public API
@@ -151,25 +261,52 @@ class MLPredictionService:
         years: int = 10,
         start_year: int = None,
     ) -> MLPredictionResult:
-        """Generate predictions for a multi-year timeline."""
+        """
+        Generate predictions for a multi-year timeline.
+
+        Only the promotion chain is walked year by year; salaries for every
+        year come from one batched model call, and the remaining metrics
+        are computed as array operations over all years at once.
+
+        Results are cached per (input, years, start_year), so resubmitting an
+        identical choice returns the same timeline without re-simulating.
+        """
         if start_year is None:
             start_year = datetime.now().year
 
-        predictions = []
-        current_state = self._initialize_state(input_data)
+        years = max(0, years)
+        cache_key = (input_data, years, start_year)
+        cached = self._timeline_cache.get(cache_key)
+        if cached is not None:
+            self._timeline_cache.move_to_end(cache_key)
+            return cached.model_copy(deep=True)
 
-        for year_offset in range(years):
-            year = start_year + year_offset
-            yearly_pred = self._predict_year(input_data, current_state, year, year_offset)
-            predictions.append(yearly_pred)
-            current_state = self._update_state(current_state, yearly_pred, input_data)
+        result = self._simulate_timeline(input_data, years, start_year)
+
+        self._timeline_cache[cache_key] = result
+        while len(self._timeline_cache) > _TIMELINE_CACHE_MAX_SIZE:
+            self._timeline_cache.popitem(last=False)
+        return result.model_copy(deep=True)
+
+    def _simulate_timeline(
+        self,
+        input_data: MLPredictionInput,
+        years: int,
+        start_year: int,
+    ) -> MLPredictionResult:
+        noise = self._draw_noise(years)
+
+        path = self._walk_career_path(input_data, years, noise)
+        salaries = self._predict_salaries_for_years(input_data, path["position_level_idx"])
+        predictions = self._build_predictions(input_data, path, salaries, noise, start_year)
 
         confidence = self._calculate_confidence(input_data)
 
-        return MLPredictionResult(
+        return MLPredictionResult.model_construct(
             predictions=predictions,
             confidence_score=confidence,
             model_version=self.MODEL_VERSION if self.model_available else "1.0.0-fallback",
+            created_at=datetime.utcnow(),
             prediction_metadata={
                 "input_features": self.feature_engineer.encode_categorical_features(input_data),
                 "start_year": start_year,
@@ -178,307 +315,322 @@ class MLPredictionService:
             },
         )
 
-    # ------------------------------------------------------------------
-    # Internal — state management
-    # ------------------------------------------------------------------
-
-    def _initialize_state(self, input_data: MLPredictionInput) -> Dict[str, Any]:
-        """Initialize the state for year 0."""
-        initial_salary = self._predict_salary_for_year(input_data, year_offset=0)
-        work_life_balance = self.feature_engineer.calculate_work_life_balance(input_data)
-
-        location_value = input_data.location_type
-        if hasattr(location_value, "value"):
-            location_value = location_value.value
-
+    def _draw_noise(self, years: int) -> Dict[str, np.ndarray]:
+        """Pre-sample every random input of a timeline from the service's generator."""
+        rng = self._rng
         return {
-            "current_salary": initial_salary,
-            "position_level": input_data.position_level,
-            "years_in_position": 0,
-            "total_experience": input_data.years_experience,
-            "work_life_balance": work_life_balance,
-            "location": location_value,
-            "promotions_received": 0,
-            "performance_score": 7.0,
-            "career_stability": self.feature_engineer.calculate_career_stability(input_data),
-            "detected_profession": input_data.detected_profession,
+            "promotion": rng.random(years),
+            "performance": rng.uniform(-0.5, 0.5, years),
+            "relationship": rng.uniform(-0.5, 0.5, years),
+            "personal_growth": rng.uniform(-0.3, 0.3, years),
         }
 
     # ------------------------------------------------------------------
-    # Internal — yearly prediction
+    # Internal — career path (the only year-to-year dependency)
     # ------------------------------------------------------------------
 
-    def _predict_year(
+    def _walk_career_path(
         self,
         input_data: MLPredictionInput,
-        state: Dict[str, Any],
-        year: int,
-        year_offset: int,
-    ) -> YearlyPrediction:
-        career_metrics = self._predict_career_metrics(input_data, state, year_offset)
-        life_quality = self._predict_life_quality(input_data, state, career_metrics, year_offset)
-        events = self._predict_major_events(input_data, state, year_offset)
-
-        return YearlyPrediction(
-            year=year,
-            career_metrics=career_metrics,
-            life_quality=life_quality,
-            major_event_probability=events,
-            location=state["location"],
-        )
+        years: int,
+        noise: Dict[str, np.ndarray],
+    ) -> Dict[str, Any]:
+        """
+        Walk the promotion chain year by year.
+
+        Performance and stability do not depend on promotions, so their
+        paths are laid out first and the promotion probability for every
+        possible tenure is tabulated in one vectorized pass. Only the chain
+        itself stays sequential — whether a year ends in a promotion depends
+        on the years in position, which depends on earlier promotions — and
+        it is reduced to table lookups.
+        """
+        performance = self._performance_path(noise["performance"], years)
+        state_stability, career_stability = self._stability_path(input_data, years)
+
+        base_prob, growth_factor = FeatureEngineer.promotion_factors(input_data)
+        prob_table = FeatureEngineer.promotion_probability_table(
+            base_prob, growth_factor, performance,
+        ).tolist()
+        promotion_draws = noise["promotion"].tolist()
+
+        # Unknown levels are treated as entry level
+        level_idx = _POSITION_INDEX.get(input_data.position_level, 0)
+        top_idx = len(POSITION_LEVELS) - 1
+        in_position = 0
+
+        position_level_idx = [0] * years
+        years_in_position = [0] * years
+        promotion_probability = [0.0] * years
+        for year_offset in range(years):
+            promotion_prob = prob_table[year_offset][min(in_position, 5)]
+            position_level_idx[year_offset] = level_idx
+            years_in_position[year_offset] = in_position
+            promotion_probability[year_offset] = promotion_prob
+
+            if promotion_draws[year_offset] < round(promotion_prob, 3):
+                # A promotion at the top level changes nothing
+                if level_idx < top_idx:
+                    level_idx += 1
+                    in_position = 0
+            else:
+                in_position += 1
+
+        return {
+            "position_level_idx": np.array(position_level_idx, dtype=int),
+            "years_in_position": np.array(years_in_position, dtype=float),
+            "performance_score": np.array(performance),
+            "state_stability": np.array(state_stability),
+            "career_stability": np.array(career_stability),
+            "promotion_probability": np.array(promotion_probability),
+        }
+
+    @staticmethod
+    def _performance_path(performance_noise: np.ndarray, years: int) -> List[float]:
+        """Performance score at the start of each year (7.0, drifting within 4-10)."""
+        performance = [0.0] * years
+        score = 7.0
+        for year_offset, change in enumerate(performance_noise.tolist()[:years]):
+            performance[year_offset] = score
+            score = max(4.0, min(10.0, score + change))
+        return performance
+
+    def _stability_path(self, input_data: MLPredictionInput, years: int) -> Tuple[List[float], List[float]]:
+        """
+        Career stability per year: the value carried into the year and the
+        reported (rounded) value, which grows after the first three years.
+        """
+        carried = [0.0] * years
+        reported = [0.0] * years
+        stability = self.feature_engineer.calculate_career_stability(input_data)
+        for year_offset in range(years):
+            carried[year_offset] = stability
+            if year_offset > 2:
+                stability = min(10.0, stability + 0.3 * year_offset)
+            stability = round(stability, 1)
+            reported[year_offset] = stability
+        return carried, reported
 
     # ------------------------------------------------------------------
     # Salary prediction — model-first with formula fallback
     # ------------------------------------------------------------------
 
-    def _predict_salary_for_year(
+    def _predict_salaries_for_years(
         self,
         input_data: MLPredictionInput,
-        year_offset: int,
-        position_level: str = None,
-    ) -> float:
+        position_level_idx: np.ndarray,
+    ) -> np.ndarray:
         """
-        Predict salary for a given year using the trained model.
+        Predict the salary for each year using the trained model.
 
         Falls back to formula-based estimation if the model is unavailable.
         """
-        if position_level is None:
-            position_level = input_data.position_level
-
-        career_field = FeatureEngineer._get_key(input_data.career_field)
-        education_level = FeatureEngineer._get_key(input_data.education_level)
-        location_type = FeatureEngineer._get_key(input_data.location_type)
+        offsets = np.arange(len(position_level_idx))
+        if not len(position_level_idx):
+            return offsets.astype(float)
 
-        model_salary = self._predict_salary_with_model(
+        model_salaries = self._predict_salaries_with_model(
             profession=input_data.detected_profession,
-            career_field=career_field,
-            position_level=position_level,
-            education_level=education_level,
-            location_type=location_type,
-            age=input_data.age + year_offset,
-            years_experience=input_data.years_experience + year_offset,
+            career_field=FeatureEngineer._get_key(input_data.career_field),
+            position_levels=[POSITION_LEVELS[i] for i in position_level_idx],
+            education_level=FeatureEngineer._get_key(input_data.education_level),
+            location_type=FeatureEngineer._get_key(input_data.location_type),
+            ages=input_data.age + offsets,
+            years_experience=input_data.years_experience + offsets,
             has_remote=input_data.has_remote_option,
             is_career_change=input_data.is_career_change,
             industry_growth_rate=input_data.industry_growth_rate,
         )
 
-        if model_salary is not None:
+        if model_salaries is not None:
             # Blend with current salary if available (keeps predictions grounded)
-            if input_data.current_salary and year_offset == 0:
-                model_salary = model_salary * 0.6 + input_data.current_salary * 0.4
-            return model_salary
+            if input_data.current_salary:
+                model_salaries[0] = model_salaries[0] * 0.6 + input_data.current_salary * 0.4
+            return model_salaries
 
         # Fallback: formula-based estimation
-        return self._fallback_salary(input_data, year_offset)
+        return self._fallback_salary(input_data, offsets)
 
-    def _fallback_salary(self, input_data: MLPredictionInput, year_offset: int) -> float:
+    def _fallback_salary(self, input_data: MLPredictionInput, year_offsets: np.ndarray) -> np.ndarray:
         """Formula-based salary estimation when model is unavailable."""
         base = self.feature_engineer.calculate_base_salary(input_data)
         growth_rate = 0.03 + input_data.industry_growth_rate
-        return base * ((1 + growth_rate) ** year_offset)
+        return base * ((1 + growth_rate) ** year_offsets)
 
     # ------------------------------------------------------------------
-    # Career metrics
+    # Yearly predictions
     # ------------------------------------------------------------------
 
-    def _predict_career_metrics(
+    def _build_predictions(
         self,
         input_data: MLPredictionInput,
-        state: Dict[str, Any],
-        year_offset: int,
-    ) -> CareerMetrics:
-        salary = self._predict_salary_for_year(
-            input_data, year_offset, position_level=state["position_level"]
-        )
-
-        promotion_prob = self.feature_engineer.calculate_promotion_probability(
-            input_data,
-            state["years_in_position"],
-            state["performance_score"],
-        )
-
-        position_title = self._generate_position_title(
-            input_data.career_field,
-            state["position_level"],
-            state["total_experience"] + year_offset,
-            input_data.detected_profession,
-            year_offset,
-        )
-
-        stability = state["career_stability"]
-        if year_offset > 2:
-            stability = min(10.0, stability + 0.3 * year_offset)
-
-        satisfaction = self.feature_engineer.calculate_job_satisfaction(
-            input_data, state["work_life_balance"]
-        )
-        if input_data.is_career_change and year_offset < 3:
-            satisfaction -= (3 - year_offset) * 0.3
-        elif year_offset > 5:
-            satisfaction += min(1.0, (year_offset - 5) * 0.1)
-
-        work_life_balance = state["work_life_balance"]
-        stress = self.feature_engineer.calculate_stress_level(input_data, work_life_balance)
-
-        return CareerMetrics(
-            salary=round(salary, 2),
-            promotion_probability=round(promotion_prob, 3),
-            position_title=position_title,
-            career_stability=round(stability, 1),
-            job_satisfaction=round(max(1.0, min(10.0, satisfaction)), 1),
-            work_life_balance=round(work_life_balance, 1),
-            stress_level=round(stress, 1),
-        )
-
-    # ------------------------------------------------------------------
-    # Life quality metrics
-    # ------------------------------------------------------------------
-
-    def _predict_life_quality(
-        self,
-        input_data: MLPredictionInput,
-        state: Dict[str, Any],
-        career_metrics: CareerMetrics,
-        year_offset: int,
-    ) -> LifeQualityMetrics:
-        current_age = input_data.age + year_offset
-
-        financial_security = self.feature_engineer.calculate_financial_security(
-            career_metrics.salary, current_age, input_data.location_type
-        )
-        health = self.feature_engineer.calculate_health_score(
-            current_age, career_metrics.stress_level,
-            career_metrics.work_life_balance, financial_security,
-        )
+        path: Dict[str, Any],
+        salaries: np.ndarray,
+        noise: Dict[str, np.ndarray],
+        start_year: int,
+    ) -> List[YearlyPrediction]:
+        fe = self.feature_engineer
+        years = len(salaries)
+        offsets = np.arange(years)
+
+        location = input_data.location_type
+        if hasattr(location, "value"):
+            location = location.value
+
+        # Work-life balance is carried year to year as the rounded metric, so
+        # the balance-driven scores only take two values across the timeline
+        base_balance = fe.calculate_work_life_balance(input_data)
+        carried_balance = round(base_balance, 1)
+        balance = np.full(years, carried_balance)
+        balance[:1] = base_balance
+        stress = np.full(years, fe.calculate_stress_level(input_data, carried_balance))
+        stress[:1] = fe.calculate_stress_level(input_data, base_balance)
+        satisfaction = np.full(years, fe.calculate_job_satisfaction(input_data, carried_balance))
+        satisfaction[:1] = fe.calculate_job_satisfaction(input_data, base_balance)
+
+        # Career change dips satisfaction early on; long tenure adds a little
+        if input_data.is_career_change:
+            satisfaction += np.where(offsets < 3, -(3 - offsets) * 0.3, 0.0)
+        satisfaction += np.where(offsets > 5, np.minimum(1.0, (offsets - 5) * 0.1), 0.0)
+
+        salary_out = np.array([round(s, 2) for s in salaries.tolist()])
+        balance_out = _round_each(balance, 1)
+        stress_out = _round_each(stress, 1)
+        satisfaction_out = _round_each(np.clip(satisfaction, 1.0, 10.0), 1)
+
+        ages = input_data.age + offsets
+        financial_security = np.array([
+            fe.calculate_financial_security(s, a, input_data.location_type)
+            for s, a in zip(salary_out.tolist(), ages.tolist())
+        ])
+        health = np.array([
+            fe.calculate_health_score(a, st, b, f)
+            for a, st, b, f in zip(ages.tolist(), stress_out.tolist(), balance_out.tolist(), financial_security.tolist())
+        ])
         relationship = self._predict_relationship_quality(
-            career_metrics.work_life_balance, career_metrics.stress_level,
-            state["career_stability"], year_offset,
+            balance_out, stress_out, path["state_stability"], offsets, noise["relationship"],
         )
         personal_growth = self._predict_personal_growth(
-            career_metrics.job_satisfaction, input_data.is_career_change, year_offset,
-        )
-
-        happiness = (
-            career_metrics.job_satisfaction * 0.25
-            + financial_security * 0.20
-            + health * 0.20
-            + relationship * 0.20
-            + personal_growth * 0.15
+            satisfaction_out, input_data.is_career_change, offsets, noise["personal_growth"],
         )
 
-        return LifeQualityMetrics(
-            happiness_score=round(max(1.0, min(10.0, happiness)), 1),
-            financial_security=round(financial_security, 1),
-            health_score=round(health, 1),
-            relationship_quality=round(relationship, 1),
-            personal_growth=round(personal_growth, 1),
-        )
+        happiness = np.column_stack(
+            (satisfaction_out, financial_security, health, relationship, personal_growth)
+        ) @ _HAPPINESS_WEIGHTS
+
+        # Output rounding is done once per metric group before the loop.
+        # Values often land exactly on a rounding boundary, where np.round's
+        # scale-and-rint disagrees with Python's correctly rounded round(), so
+        # every metric goes through round() element-wise
+        promotion_prob = path["promotion_probability"].tolist()
+        promotion_out = _round_each(path["promotion_probability"], 3).tolist()
+        life_out = _round_each(np.column_stack((
+            np.clip(happiness, 1.0, 10.0), financial_security, relationship, personal_growth,
+        )), 1).tolist()
+        health_out = [round(h, 1) for h in health.tolist()]
+        career_out = np.column_stack((
+            path["career_stability"], satisfaction_out, balance_out, stress_out,
+        )).tolist()
+        salary_list = salary_out.tolist()
+        level_idx = path["position_level_idx"].tolist()
+
+        # Every metric above is already clamped and rounded, so the models are
+        # built without re-running field validation
+        predictions = []
+        for i in range(years):
+            career_stability, job_satisfaction, work_life_balance, stress_level = career_out[i]
+            happiness_score, security, relationship_quality, growth = life_out[i]
+            career_metrics = CareerMetrics.model_construct(
+                salary=salary_list[i],
+                promotion_probability=promotion_out[i],
+                position_title=self._generate_position_title(
+                    input_data.career_field,
+                    level_idx[i],
+                    input_data.years_experience + 2 * i,
+                    input_data.detected_profession,
+                    i,
+                ),
+                career_stability=career_stability,
+                job_satisfaction=job_satisfaction,
+                work_life_balance=work_life_balance,
+                stress_level=stress_level,
+            )
+            life_quality = LifeQualityMetrics.model_construct(
+                happiness_score=happiness_score,
+                financial_security=security,
+                health_score=health_out[i],
+                relationship_quality=relationship_quality,
+                personal_growth=growth,
+            )
+            predictions.append(YearlyPrediction.model_construct(
+                year=start_year + i,
+                career_metrics=career_metrics,
+                life_quality=life_quality,
+                major_event_probability=self._predict_major_events(
+                    input_data, i, promotion_prob[i],
+                ),
+                location=location,
+            ))
+        return predictions
 
     def _predict_relationship_quality(
-        self, work_life_balance: float, stress_level: float,
-        career_stability: float, year_offset: int,
-    ) -> float:
+        self, work_life_balance: np.ndarray, stress_level: np.ndarray,
+        career_stability: np.ndarray, year_offsets: np.ndarray, noise: np.ndarray,
+    ) -> np.ndarray:
         base_quality = work_life_balance * 0.6 + (10 - stress_level) * 0.3 + career_stability * 0.1
-        time_factor = min(1.5, 1 + year_offset * 0.05)
-        quality = base_quality * time_factor + random.uniform(-0.5, 0.5)
-        return max(1.0, min(10.0, quality))
+        time_factor = np.minimum(1.5, 1 + year_offsets * 0.05)
+        quality = base_quality * time_factor + noise
+        return np.clip(quality, 1.0, 10.0)
 
     def _predict_personal_growth(
-        self, job_satisfaction: float, is_career_change: bool, year_offset: int,
-    ) -> float:
-        if is_career_change and year_offset < 3:
-            base_growth = 8.5 - year_offset * 0.5
+        self, job_satisfaction: np.ndarray, is_career_change: bool,
+        year_offsets: np.ndarray, noise: np.ndarray,
+    ) -> np.ndarray:
+        if is_career_change:
+            base_growth = np.where(year_offsets < 3, 8.5 - year_offsets * 0.5, 7.0)
         else:
-            base_growth = 7.0
+            base_growth = np.full(len(year_offsets), 7.0)
         growth = base_growth * 0.5 + job_satisfaction * 0.5
-        if year_offset > 5 and not is_career_change:
-            growth -= (year_offset - 5) * 0.2
-        growth += random.uniform(-0.3, 0.3)
-        return max(1.0, min(10.0, growth))
+        if not is_career_change:
+            growth -= np.maximum(0, year_offsets - 5) * 0.2
+        growth += noise
+        return np.clip(growth, 1.0, 10.0)
 
     # ------------------------------------------------------------------
     # Major events
     # ------------------------------------------------------------------
 
     def _predict_major_events(
-        self, input_data: MLPredictionInput, state: Dict[str, Any], year_offset: int,
+        self, input_data: MLPredictionInput, year_offset: int, promotion_prob: float,
     ) -> Dict[str, float]:
-        events = {}
+        early_relocation = input_data.is_location_change and year_offset < 2
+        # Experience advances once per simulated year on top of the offset
+        total_exp = input_data.years_experience + 2 * year_offset
+        milestone = total_exp % 5 == 0 and total_exp > 0
 
-        promotion_prob = self.feature_engineer.calculate_promotion_probability(
-            input_data, state["years_in_position"], state["performance_score"],
-        )
+        if promotion_prob <= 0.1 and not early_relocation and year_offset <= 5 and not milestone:
+            return _EMPTY_EVENTS
+
+        events = {}
         if promotion_prob > 0.1:
             events["promotion"] = promotion_prob
 
-        if state.get("job_satisfaction", 7) < 5:
-            events["job_change"] = 0.15 + (5 - state.get("job_satisfaction", 7)) * 0.05
-
-        if input_data.is_location_change and year_offset < 2:
+        if early_relocation:
             events["relocation"] = 0.05
         elif year_offset > 5:
             events["relocation"] = 0.08
 
-        financial_security = state.get("financial_security", 5)
-        if financial_security > 7:
-            events["major_purchase"] = 0.12
-
-        total_exp = state["total_experience"] + year_offset
-        if total_exp % 5 == 0 and total_exp > 0:
+        if milestone:
             events["career_milestone"] = 0.6
 
         return events
 
-    # ------------------------------------------------------------------
-    # State update
-    # ------------------------------------------------------------------
-
-    def _update_state(
-        self, state: Dict[str, Any], prediction: YearlyPrediction,
-        input_data: MLPredictionInput,
-    ) -> Dict[str, Any]:
-        new_state = state.copy()
-        new_state["current_salary"] = prediction.career_metrics.salary
-
-        if random.random() < prediction.career_metrics.promotion_probability:
-            new_state = self._apply_promotion(new_state, input_data)
-        else:
-            new_state["years_in_position"] += 1
-
-        new_state["total_experience"] += 1
-        performance_change = random.uniform(-0.5, 0.5)
-        new_state["performance_score"] = max(4.0, min(10.0,
-            new_state["performance_score"] + performance_change
-        ))
-        new_state["work_life_balance"] = prediction.career_metrics.work_life_balance
-        new_state["career_stability"] = prediction.career_metrics.career_stability
-        return new_state
-
-    def _apply_promotion(self, state: Dict[str, Any], input_data: MLPredictionInput) -> Dict[str, Any]:
-        current_idx = POSITION_LEVELS.index(state["position_level"])
-        if current_idx < len(POSITION_LEVELS) - 1:
-            new_state = state.copy()
-            new_state["position_level"] = POSITION_LEVELS[current_idx + 1]
-            new_state["years_in_position"] = 0
-            new_state["promotions_received"] += 1
-            # Re-predict salary at new level via model
-            new_salary = self._predict_salary_for_year(
-                input_data,
-                year_offset=int(new_state["total_experience"] - input_data.years_experience),
-                position_level=new_state["position_level"],
-            )
-            # Ensure promotion is at least a 10% raise
-            new_state["current_salary"] = max(new_salary, state["current_salary"] * 1.10)
-            new_state["work_life_balance"] = max(3.0, new_state["work_life_balance"] - 0.5)
-            return new_state
-        return state
-
     # ------------------------------------------------------------------
     # Position titles (unchanged — data-driven from profession_data.py)
     # ------------------------------------------------------------------
 
     def _generate_position_title(
-        self, career_field: CareerField, position_level: str,
+        self, career_field: CareerField, position_level_idx: int,
         years_experience: float, detected_profession: str = None,
         year_offset: int = 0,
     ) -> str:
@@ -488,56 +640,9 @@ class MLPredictionService:
                 return get_training_career_title(detected_profession, year_offset, training_config)
             profession_titles = get_profession_titles_by_level(detected_profession)
             if profession_titles:
-                return profession_titles.get(position_level, profession_titles.get("entry"))
+                return profession_titles.get(POSITION_LEVELS[position_level_idx], profession_titles.get("entry"))
 
-        titles = {
-            CareerField.TECHNOLOGY: {
-                "entry": "Software Engineer I", "mid": "Software Engineer II",
-                "senior": "Senior Software Engineer", "lead": "Engineering Manager",
-                "executive": "VP of Engineering",
-            },
-            CareerField.FINANCE: {
-                "entry": "Financial Analyst", "mid": "Senior Financial Analyst",
-                "senior": "Finance Manager", "lead": "Director of Finance",
-                "executive": "Chief Financial Officer",
-            },
-            CareerField.HEALTHCARE: {
-                "entry": "Healthcare Professional", "mid": "Senior Healthcare Professional",
-                "senior": "Department Head", "lead": "Medical Director",
-                "executive": "Chief Medical Officer",
-            },
-            CareerField.ENGINEERING: {
-                "entry": "Engineer I", "mid": "Engineer II",
-                "senior": "Senior Engineer", "lead": "Principal Engineer",
-                "executive": "VP of Engineering",
-            },
-            CareerField.EDUCATION: {
-                "entry": "Teacher", "mid": "Senior Teacher",
-                "senior": "Department Chair", "lead": "Assistant Principal",
-                "executive": "Principal",
-            },
-            CareerField.BUSINESS: {
-                "entry": "Business Analyst", "mid": "Senior Business Analyst",
-                "senior": "Business Manager", "lead": "Director",
-                "executive": "VP of Operations",
-            },
-            CareerField.CREATIVE: {
-                "entry": "Junior Designer", "mid": "Designer",
-                "senior": "Senior Designer", "lead": "Design Lead",
-                "executive": "Creative Director",
-            },
-            CareerField.SERVICE: {
-                "entry": "Service Representative", "mid": "Senior Service Representative",
-                "senior": "Service Manager", "lead": "Regional Manager",
-                "executive": "Director of Operations",
-            },
-            CareerField.OTHER: {
-                "entry": "Associate", "mid": "Senior Associate",
-                "senior": "Manager", "lead": "Senior Manager",
-                "executive": "Director",
-            },
-        }
-        return titles[career_field][position_level]
+        return _POSITION_TITLES[career_field][position_level_idx]
 
     # ------------------------------------------------------------------
     # Confidence
@@ -28,6 +28,37 @@ logger = logging.getLogger(__name__)
 POSITION_LEVELS_INT = {1: "entry", 2: "mid", 3: "senior", 4: "lead", 5: "executive"}
 POSITION_LEVELS_STR = {v: k for k, v in POSITION_LEVELS_INT.items()}
 
+FEATURE_STATS_CHUNKSIZE = 100_000
+
+
+def _streaming_stats(series_chunks) -> Dict[str, float]:
+    """Mean/std/min/max over a sequence of Series, merging per-chunk moments."""
+    count, mean, m2 = 0, 0.0, 0.0
+    lo, hi = float("inf"), float("-inf")
+    for chunk in series_chunks:
+        values = chunk.dropna().to_numpy()
+        n = len(values)
+        if n == 0:
+            continue
+        chunk_mean = float(values.mean())
+        chunk_m2 = float(((values - chunk_mean) ** 2).sum())
+        total = count + n
+        delta = chunk_mean - mean
+        mean += delta * n / total
+        m2 += chunk_m2 + delta * delta * count * n / total
+        count = total
+        lo = min(lo, float(values.min()))
+        hi = max(hi, float(values.max()))
+
+    if count == 0:
+        raise ValueError("no salary values to summarize")
+    return {
+        "mean": mean,
+        "std": (m2 / (count - 1)) ** 0.5 if count > 1 else float("nan"),
+        "min": lo,
+        "max": hi,
+    }
+
 
 class ScenarioSimulator:
     """
@@ -67,18 +98,29 @@ class ScenarioSimulator:
 
     def _load_feature_stats(self):
         """Load feature statistics for realistic bounds."""
+        # Prefer the precomputed stats saved by the training pipeline
+        stats_path = self.models_dir / "salary_feature_stats.pkl"
+        try:
+            if stats_path.exists():
+                self.feature_stats = joblib.load(stats_path)
+                logger.info("Loaded precomputed feature stats")
+                return
+        except Exception as e:
+            logger.warning(f"Error loading precomputed feature stats: {e}")
+
         try:
             features_path = self.features_dir / "salary_features_enhanced.csv"
             if features_path.exists():
-                df = pd.read_csv(features_path)
-                self.feature_stats = {
-                    "salary": {
-                        "mean": df["salary"].mean(),
-                        "std": df["salary"].std(),
-                        "min": df["salary"].min(),
-                        "max": df["salary"].max(),
-                    },
-                }
+                # Only the salary column feeds the stats; skip parsing the rest,
+                # and stream it in chunks so memory stays bounded on large files
+                chunks = pd.read_csv(
+                    features_path,
+                    usecols=["salary"],
+                    dtype={"salary": "float64"},
+                    engine="c",
+                    chunksize=FEATURE_STATS_CHUNKSIZE,
+                )
+                self.feature_stats = {"salary": _streaming_stats(chunk["salary"] for chunk in chunks)}
                 logger.info(
                     f"Loaded feature stats: salary mean=${self.feature_stats['salary']['mean']:,.0f}, "
                     f"std=${self.feature_stats['salary']['std']:,.0f}"
@@ -274,7 +316,7 @@ class ScenarioSimulator:
             career_state["position_level"], career_state["field"]
         )
         life_satisfaction = self._calculate_life_satisfaction(
-            career_state, new_salary, age, multipliers,
+            career_state, new_salary, age, multipliers, work_life_balance,
         )
         financial_security = self._calculate_financial_security(new_salary, age)
         life_events = self._generate_life_events(
@@ -387,11 +429,12 @@ class ScenarioSimulator:
 
     def _calculate_life_satisfaction(
         self, career_state: Dict, salary: float, age: int, multipliers: Dict,
+        work_life_balance: float,
     ) -> float:
         stats = self.feature_stats["salary"]
         financial = min((salary / stats["mean"]) * 1.75, 3.5)
         career = career_state["satisfaction_score"] / 7.0 * 2.5
-        wlb = self._calculate_work_life_balance(career_state["position_level"], career_state["field"]) / 10 * 2
+        wlb = work_life_balance / 10 * 2
         stab = career_state["stability_score"] * 2
         base = financial + career + wlb + stab
         age_factor = 1.0 if age < 30 else 1.1 if age < 50 else 0.95
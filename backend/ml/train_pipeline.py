@@ -239,11 +239,9 @@ def encode_features(df: pd.DataFrame, encoders: dict = None, fit: bool = True):
             encoders[col] = le
         else:
             le = encoders[col]
-            # Handle unseen labels
-            known = set(le.classes_)
-            df[col + "_enc"] = df[col].apply(
-                lambda x: le.transform([x])[0] if x in known else -1
-            )
+            # Map through the fitted classes in one pass; unseen labels get -1
+            codes = {label: i for i, label in enumerate(le.classes_)}
+            df[col + "_enc"] = df[col].map(codes).fillna(-1).astype(int)
 
     feature_cols = [
         "age",
@@ -369,7 +367,21 @@ def run_pipeline(output_dir: str = "ml/models", n_samples: int = 15000):
     joblib.dump(encoders, output_path / "salary_encoders.pkl")
     joblib.dump(feature_cols, output_path / "salary_feature_cols.pkl")
 
-    logger.info(f"Saved: salary_model.pkl, salary_scaler.pkl, salary_encoders.pkl, salary_feature_cols.pkl")
+    # Summary stats used by ScenarioSimulator, so it doesn't have to parse the features CSV
+    feature_stats = {
+        "salary": {
+            "mean": float(df["salary"].mean()),
+            "std": float(df["salary"].std()),
+            "min": float(df["salary"].min()),
+            "max": float(df["salary"].max()),
+        },
+    }
+    joblib.dump(feature_stats, output_path / "salary_feature_stats.pkl")
+
+    logger.info(
+        f"Saved: salary_model.pkl, salary_scaler.pkl, salary_encoders.pkl, "
+        f"salary_feature_cols.pkl, salary_feature_stats.pkl"
+    )
 
     # Feature importance
     logger.info("=" * 60)
@@ -1,8 +1,10 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 from enum import Enum
 
+_utcnow = datetime.utcnow
+
 class CareerField(str, Enum):
     """Career field categories"""
     TECHNOLOGY = "technology"
@@ -58,8 +60,8 @@ class MLPredictionInput(BaseModel):
     # Detected profession for salary/trajectory calculations
     detected_profession: Optional[str] = None
 
-    class Config:
-        use_enum_values = True
+    # Frozen so the input is hashable and predictions can be cached per input
+    model_config = ConfigDict(use_enum_values=True, frozen=True)
 
 class CareerMetrics(BaseModel):
     """Career-related predictions"""
@@ -93,12 +95,7 @@ class MLPredictionResult(BaseModel):
     confidence_score: float = Field(..., ge=0, le=1)
     model_version: str
     prediction_metadata: Dict[str, Any] = Field(default_factory=dict)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    created_at: datetime = Field(default_factory=_utcnow)
 
 class DatasetMetadata(BaseModel):
     """Metadata for ML training datasets"""
@@ -109,12 +106,7 @@ class DatasetMetadata(BaseModel):
     local_path: Optional[str] = None
     num_records: Optional[int] = None
     features: List[str] = Field(default_factory=list)
-    last_updated: datetime = Field(default_factory=datetime.utcnow)
-
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    last_updated: datetime = Field(default_factory=_utcnow)
 
 class ModelMetrics(BaseModel):
     """ML model performance metrics"""
@@ -126,10 +118,5 @@ class ModelMetrics(BaseModel):
     r2_score: Optional[float] = None
     training_samples: int
     validation_samples: int
-    training_date: datetime = Field(default_factory=datetime.utcnow)
+    training_date: datetime = Field(default_factory=_utcnow)
     hyperparameters: Dict[str, Any] = Field(default_factory=dict)
-
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
@@ -1,35 +1,35 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, Dict, Any
 from datetime import datetime
-import uuid
+from utils.ids import new_id
+
+_utcnow = datetime.utcnow
 
 class PaymentTransaction(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     user_id: Optional[str] = None
     session_id: str
     amount: float
     currency: str = "usd"
     payment_status: str  
     package_type: Optional[str] = None  
-    metadata: Optional[Dict[str, Any]] = {}
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    metadata: Optional[Dict[str, Any]] = None
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
     completed_at: Optional[datetime] = None
+    upgrade_claimed_at: Optional[datetime] = None
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    model_config = ConfigDict(frozen=True, extra="ignore")
 
 class PaymentStatus(BaseModel):
     payment_status: str
     amount: float
     currency: str
     session_id: str
-    metadata: Optional[Dict[str, Any]] = {}
+    metadata: Optional[Dict[str, Any]] = None
 
 class CheckoutRequest(BaseModel):
     package: str  
     success_url: Optional[str] = None
     cancel_url: Optional[str] = None
-    metadata: Optional[Dict[str, Any]] = {}
\ No newline at end of file
+    metadata: Optional[Dict[str, Any]] = None
\ No newline at end of file
@@ -1,7 +1,16 @@
-from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional, Dict, Any, Union
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field, computed_field
+from typing import Annotated, List, Optional, Dict, Any
 from datetime import datetime
-import uuid
+from math import fsum
+from utils.ids import new_id
+
+_utcnow = datetime.utcnow
+
+# Numbers sent for free-text context fields are kept as strings
+_CoercedStr = Annotated[Optional[str], BeforeValidator(lambda v: str(v) if v is not None else v)]
+
+def _mean_happiness(timeline: List["TimelinePoint"]) -> Optional[float]:
+    return fsum(point.happiness_score for point in timeline) / len(timeline) if timeline else None
 
 class LifeChoice(BaseModel):
     title: str
@@ -9,24 +18,10 @@ class LifeChoice(BaseModel):
     category: str  
 
 class UserContext(BaseModel):
-    age: Optional[Union[str, int]] = None
+    age: _CoercedStr = None
     current_location: Optional[str] = None
-    current_salary: Optional[Union[str, int, float]] = None
+    current_salary: _CoercedStr = None
     education_level: Optional[str] = None
-    
-    @field_validator('age', mode='before')
-    @classmethod
-    def convert_age_to_string(cls, v):
-        if v is not None:
-            return str(v)
-        return v
-    
-    @field_validator('current_salary', mode='before')
-    @classmethod
-    def convert_salary_to_string(cls, v):
-        if v is not None:
-            return str(v)
-        return v
 
 class SimulationRequest(BaseModel):
     choice_a: LifeChoice
@@ -42,7 +37,7 @@ class TimelinePoint(BaseModel):
     career_title: Optional[str] = None
 
 class Simulation(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     user_id: Optional[str] = None
     choice_a: LifeChoice
     choice_b: LifeChoice
@@ -50,14 +45,22 @@ class Simulation(BaseModel):
     choice_a_timeline: List[TimelinePoint]
     choice_b_timeline: List[TimelinePoint]
     summary: str
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
     is_public: bool = False
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
+    # Stored with the document so analytics don't have to re-read the timelines
+    @computed_field
+    @property
+    def avg_happiness_a(self) -> Optional[float]:
+        return _mean_happiness(self.choice_a_timeline)
+
+    @computed_field
+    @property
+    def avg_happiness_b(self) -> Optional[float]:
+        return _mean_happiness(self.choice_b_timeline)
 
 class SimulationResult(BaseModel):
     id: str
@@ -66,7 +69,4 @@ class SimulationResult(BaseModel):
     summary: str
     created_at: datetime
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
\ No newline at end of file
+    model_config = ConfigDict(frozen=True, extra="ignore")
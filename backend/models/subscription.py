@@ -1,8 +1,11 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
 from enum import Enum
-import uuid
+from types import MappingProxyType
+from utils.ids import new_id
+
+_utcnow = datetime.utcnow
 
 class SubscriptionTier(str, Enum):
     FREE = "free"
@@ -20,7 +23,7 @@ class BillingPeriod(str, Enum):
     YEARLY = "yearly"
 
 class Subscription(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     user_id: str
     tier: SubscriptionTier = SubscriptionTier.FREE
     status: SubscriptionStatus = SubscriptionStatus.INACTIVE
@@ -31,46 +34,48 @@ class Subscription(BaseModel):
     current_period_end: Optional[datetime] = None
     trial_end: Optional[datetime] = None
     cancelled_at: Optional[datetime] = None
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
+    # Status and tier are validated into enum members, so they are compared
+    # by identity. Each check takes an optional `now` so callers evaluating
+    # several of them read the clock once.
 
-    def is_active(self) -> bool:
+    def is_active(self, now: Optional[datetime] = None) -> bool:
         """Check if subscription is currently active"""
-        if self.status != SubscriptionStatus.ACTIVE:
+        if self.status is not SubscriptionStatus.ACTIVE:
             return False
 
-        if self.current_period_end and self.current_period_end < datetime.utcnow():
+        if self.current_period_end and self.current_period_end < (now or _utcnow()):
             return False
 
         return True
 
-    def is_trial(self) -> bool:
+    def is_trial(self, now: Optional[datetime] = None) -> bool:
         """Check if user is in trial period"""
         return (
-            self.status == SubscriptionStatus.TRIAL and
-            self.trial_end and
-            self.trial_end > datetime.utcnow()
+            self.status is SubscriptionStatus.TRIAL and
+            self.trial_end is not None and
+            self.trial_end > (now or _utcnow())
         )
 
-    def has_premium_access(self) -> bool:
+    def has_premium_access(self, now: Optional[datetime] = None) -> bool:
         """Check if user has premium features access"""
-        return (
-            self.tier == SubscriptionTier.PREMIUM and
-            (self.is_active() or self.is_trial())
-        )
+        if self.tier is not SubscriptionTier.PREMIUM:
+            return False
+
+        now = now or _utcnow()
+        return self.is_active(now) or self.is_trial(now)
 
-    def days_until_expiry(self) -> Optional[int]:
+    def days_until_expiry(self, now: Optional[datetime] = None) -> Optional[int]:
         """Get days until subscription expires"""
         if not self.current_period_end:
             return None
 
-        delta = self.current_period_end - datetime.utcnow()
+        delta = self.current_period_end - (now or _utcnow())
         return max(0, delta.days)
 
 class UsageLimit(BaseModel):
@@ -87,8 +92,8 @@ class UsageLimit(BaseModel):
     custom_scenarios: bool = False
     historical_data_months: int = 1  # How far back user can view data
 
-# Define tier limits
-TIER_LIMITS = {
+# Define tier limits (read-only; looked up on every gated request)
+TIER_LIMITS = MappingProxyType({
     SubscriptionTier.FREE: UsageLimit(
         tier=SubscriptionTier.FREE,
         simulations_per_week=3,
@@ -115,11 +120,11 @@ TIER_LIMITS = {
         custom_scenarios=True,
         historical_data_months=12
     )
-}
+})
 
 class UsageTracking(BaseModel):
     """Track user usage for billing and limits"""
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     user_id: str
     subscription_id: str
     period_start: datetime
@@ -129,10 +134,7 @@ class UsageTracking(BaseModel):
     ml_predictions_used: int = 0
     ml_insights_used: int = 0
     features_used: Dict[str, int] = Field(default_factory=dict)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
\ No newline at end of file
+    model_config = ConfigDict(frozen=True, extra="ignore")
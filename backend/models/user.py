@@ -1,24 +1,23 @@
-from pydantic import BaseModel, Field
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field
 from typing import Optional
 from datetime import datetime
-import uuid
+from utils.ids import new_id
+
+_utcnow = datetime.utcnow
 
 class User(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     clerk_id: str
     email: str
     first_name: Optional[str] = None
     last_name: Optional[str] = None
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
     subscription_tier: str = "free"     
     last_login: Optional[datetime] = None
     is_active: bool = True
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    model_config = ConfigDict(frozen=True, extra="ignore")
 
 class UserCreate(BaseModel):
     clerk_id: str
@@ -26,6 +25,12 @@ class UserCreate(BaseModel):
     first_name: Optional[str] = None
     last_name: Optional[str] = None
 
+class UserSyncData(BaseModel):
+    """Profile fields sent by the client on sign-in"""
+    email: Optional[str] = None
+    first_name: Optional[str] = Field(None, validation_alias=AliasChoices("first_name", "firstName"))
+    last_name: Optional[str] = Field(None, validation_alias=AliasChoices("last_name", "lastName"))
+
 class UserUpdate(BaseModel):
     email: Optional[str] = None
     first_name: Optional[str] = None
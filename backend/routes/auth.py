@@ -1,18 +1,25 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Body
 from typing import Optional
 from datetime import datetime
 import logging
 
-from models.user import User, UserCreate, UserUpdate
+from models.user import User, UserCreate, UserSyncData, UserUpdate
 from database import get_database
 from auth import get_current_user, verify_clerk_token
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
+# Fields returned by GET /auth/profile
+_PROFILE_PROJECTION = {
+    "_id": 1, "clerk_id": 1, "email": 1, "first_name": 1, "last_name": 1,
+    "subscription_tier": 1, "last_login": 1, "is_active": 1,
+    "created_at": 1, "updated_at": 1,
+}
+
 @router.post("/sync")
 async def sync_user_profile(
-    user_data: dict,
+    user_data: UserSyncData = Body(default_factory=UserSyncData),
     current_user: Optional[dict] = Depends(get_current_user)
 ):
     """Sync user profile from Clerk to MongoDB"""
@@ -22,20 +29,21 @@ async def sync_user_profile(
     db = await get_database()
     clerk_id = current_user.get("clerk_id")
     
+    now = datetime.utcnow()
     user_doc = {
         "clerk_id": clerk_id,
-        "email": user_data.get("email"),
-        "first_name": user_data.get("first_name"),
-        "last_name": user_data.get("last_name"),
-        "last_login": datetime.utcnow()
+        "email": user_data.email,
+        "first_name": user_data.first_name,
+        "last_name": user_data.last_name,
+        "last_login": now
     }
     
     result = await db.users.update_one(
         {"clerk_id": clerk_id},
         {
-            "$set": {**user_doc, "updated_at": datetime.utcnow()},
+            "$set": {**user_doc, "updated_at": now},
             "$setOnInsert": {
-                "created_at": datetime.utcnow(),
+                "created_at": now,
                 "subscription_tier": "free",
                 "is_active": True
             }
@@ -53,14 +61,13 @@ async def get_user_profile(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=401, detail="Authentication required")
     
     db = await get_database()
-    user = await db.users.find_one({"clerk_id": current_user["clerk_id"]})
+    user = await db.users.find_one(
+        {"clerk_id": current_user["clerk_id"]}, projection=_PROFILE_PROJECTION
+    )
     
     if not user:
         raise HTTPException(status_code=404, detail="User profile not found")
     
-    if "_id" in user:
-        user["_id"] = str(user["_id"])
-    
     return user
 
 @router.put("/profile")
@@ -76,7 +83,7 @@ async def update_user_profile(
     clerk_id = current_user["clerk_id"]
     
     # Only update non-None fields
-    update_fields = {k: v for k, v in update_data.dict().items() if v is not None}
+    update_fields = update_data.model_dump(exclude_unset=True, exclude_none=True)
     if update_fields:
         update_fields["updated_at"] = datetime.utcnow()
         
@@ -1,22 +1,54 @@
+import asyncio
+import itertools
+import time
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import ORJSONResponse
 from typing import Optional
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
+from types import MappingProxyType
+from pymongo import ReturnDocument
 
 from models.payment import PaymentTransaction, PaymentStatus, CheckoutRequest
-from models.subscription import BillingPeriod
+from models.subscription import BillingPeriod, SubscriptionStatus, SubscriptionTier
 from database import get_database
 from auth import get_current_user
 from services.stripe_service import create_stripe_checkout, get_stripe_payment_status
 from services.subscription_service import SubscriptionService
 from config import FRONTEND_URL
+from utils.ids import new_id
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/payments", tags=["payments"])
 
 # Define packages 
-PACKAGES = {
-    "premium_monthly": {"amount": 4.99, "name": "Premium Monthly"}
+PACKAGES = MappingProxyType({
+    "premium_monthly": MappingProxyType({"amount": 4.99, "name": "Premium Monthly"})
+})
+_VALID_PACKAGES = frozenset(PACKAGES)
+
+# Billing period granted by each package once paid
+_PACKAGE_PERIODS = MappingProxyType({
+    "premium_monthly": BillingPeriod.MONTHLY,
+    "premium_yearly": BillingPeriod.YEARLY
+})
+
+# A claim older than this belongs to a poll that died mid-upgrade and may be
+# taken over by the next one
+_UPGRADE_CLAIM_TIMEOUT = timedelta(minutes=5)
+
+# Stripe redirect targets; the frontend origin is fixed per deployment
+_CHECKOUT_CANCEL_URL = FRONTEND_URL.rstrip('/')
+_CHECKOUT_SUCCESS_URL = f"{_CHECKOUT_CANCEL_URL}/success?session_id={{CHECKOUT_SESSION_ID}}"
+
+# Placeholder Stripe ids for trials; the random suffix keeps workers that
+# started in the same second apart
+_trial_counter = itertools.count(int(time.time()))
+
+# Fields returned by GET /payments/transactions
+_TRANSACTION_PROJECTION = {
+    "_id": 1, "id": 1, "session_id": 1, "amount": 1, "currency": 1,
+    "payment_status": 1, "package_type": 1, "created_at": 1, "completed_at": 1,
 }
 
 @router.post("/checkout")
@@ -28,44 +60,45 @@ async def create_checkout_session(
     if not current_user:
         raise HTTPException(status_code=401, detail="Authentication required")
 
-    if package not in PACKAGES:
+    if package not in _VALID_PACKAGES:
         raise HTTPException(status_code=400, detail="Invalid package")
 
     # Check if user already has premium
     user_id = current_user.get("clerk_id")
     subscription = await SubscriptionService.get_user_subscription(user_id)
-    if subscription.tier == "premium" and subscription.status == "active":
+    if subscription.tier is SubscriptionTier.PREMIUM and subscription.status is SubscriptionStatus.ACTIVE:
         raise HTTPException(status_code=400, detail="You already have an active premium subscription")
 
     package_info = PACKAGES[package]
     db = await get_database()
 
     try:
-        frontend_url = FRONTEND_URL.rstrip('/')
-
         # Create checkout session
         session_data = await create_stripe_checkout(
             amount=package_info["amount"],
             currency="usd",
-            success_url=f"{frontend_url}/success?session_id={{CHECKOUT_SESSION_ID}}",
-            cancel_url=f"{frontend_url}",
+            success_url=_CHECKOUT_SUCCESS_URL,
+            cancel_url=_CHECKOUT_CANCEL_URL,
             metadata={
                 "package": package,
                 "user_id": str(current_user.get("clerk_id")) if current_user else "anonymous"
             }
         )
 
-        # Save transaction record
-        transaction = PaymentTransaction(
+        # Save transaction record (every field is server-built, so skip validation)
+        now = datetime.utcnow()
+        transaction = PaymentTransaction.model_construct(
             user_id=str(current_user.get("clerk_id")) if current_user else None,
             session_id=session_data["session_id"],
             amount=package_info["amount"],
             payment_status="initiated",
             package_type=package,
-            metadata={"package": package}
+            metadata={"package": package},
+            created_at=now,
+            updated_at=now
         )
         
-        await db.payment_transactions.insert_one(transaction.dict())
+        await db.payment_transactions.insert_one(transaction.model_dump())
         
         logger.info(f"Checkout session created: {session_data['session_id']}")
         return {"checkout_url": session_data["url"], "session_id": session_data["session_id"]}
@@ -84,41 +117,62 @@ async def get_payment_status(session_id: str):
         status_response = await get_stripe_payment_status(session_id)
         
         # Update transaction record
+        now = datetime.utcnow()
         update_data = {
             "payment_status": status_response["payment_status"],
-            "updated_at": datetime.utcnow()
+            "updated_at": now
         }
         
-        if status_response["payment_status"] == "paid":
-            update_data["completed_at"] = datetime.utcnow()
-        
-        await db.payment_transactions.update_one(
-            {"session_id": session_id},
-            {"$set": update_data}
-        )
-        
-        # If payment successful, upgrade user subscription
-        if status_response["payment_status"] == "paid":
-            transaction = await db.payment_transactions.find_one({"session_id": session_id})
-            if transaction and transaction.get("user_id"):
-                # Determine billing period from package
-                billing_period = BillingPeriod.YEARLY if "yearly" in transaction.get("package_type", "") else BillingPeriod.MONTHLY
-
-                # Create premium subscription using new service
-                await SubscriptionService.upgrade_to_premium(
-                    user_id=transaction["user_id"],
-                    billing_period=billing_period,
-                    stripe_subscription_id=session_id,  # In production, use actual Stripe subscription ID
-                    stripe_customer_id=status_response.get("customer", ""),
-                    trial_days=None  
-                )
+        if status_response["payment_status"] != "paid":
+            await db.payment_transactions.update_one(
+                {"session_id": session_id, "completed_at": None},
+                {"$set": update_data}
+            )
+        else:
+            # The claim marker is set by the same atomic update that matches
+            # on it, so only one concurrent poll gets the document back and
+            # runs the upgrade; completed_at is written once it has applied
+            transaction = await db.payment_transactions.find_one_and_update(
+                {
+                    "session_id": session_id,
+                    "completed_at": None,
+                    "$or": [
+                        {"upgrade_claimed_at": None},
+                        {"upgrade_claimed_at": {"$lt": now - _UPGRADE_CLAIM_TIMEOUT}}
+                    ]
+                },
+                {"$set": {**update_data, "upgrade_claimed_at": now}},
+                return_document=ReturnDocument.AFTER
+            )
 
-                # Update legacy user record for backward compatibility
-                await db.users.update_one(
-                    {"_id": transaction["user_id"]},
-                    {"$set": {"subscription_tier": "premium", "upgraded_at": datetime.utcnow()}}
+            if transaction:
+                try:
+                    if transaction.get("user_id"):
+                        # Determine billing period from package
+                        billing_period = _PACKAGE_PERIODS.get(transaction.get("package_type"), BillingPeriod.MONTHLY)
+
+                        # Create premium subscription using new service (this also
+                        # updates the legacy user record)
+                        await SubscriptionService.upgrade_to_premium(
+                            user_id=transaction["user_id"],
+                            billing_period=billing_period,
+                            stripe_subscription_id=session_id,  # In production, use actual Stripe subscription ID
+                            stripe_customer_id=status_response.get("customer", ""),
+                            trial_days=None  
+                        )
+                        logger.info(f"User {transaction['user_id']} upgraded to premium")
+                except Exception:
+                    # Release the claim so the next poll retries the upgrade
+                    await db.payment_transactions.update_one(
+                        {"session_id": session_id, "upgrade_claimed_at": now},
+                        {"$set": {"upgrade_claimed_at": None}}
+                    )
+                    raise
+
+                await db.payment_transactions.update_one(
+                    {"session_id": session_id},
+                    {"$set": {"completed_at": datetime.utcnow()}}
                 )
-                logger.info(f"User {transaction['user_id']} upgraded to premium")
         
         return {
             "payment_status": status_response["payment_status"],
@@ -138,20 +192,31 @@ async def get_user_transactions(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=401, detail="Authentication required")
     
     db = await get_database()
-    user_doc = await db.users.find_one({"clerk_id": current_user["clerk_id"]})
     
-    if not user_doc:
-        raise HTTPException(status_code=404, detail="User not found")
+    # Resolve the user and their latest transactions in one round trip
+    pipeline = [
+        {"$match": {"clerk_id": current_user["clerk_id"]}},
+        {"$lookup": {
+            "from": "payment_transactions",
+            "let": {"uid": {"$toString": "$_id"}},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$user_id", "$$uid"]}}},
+                {"$sort": {"created_at": -1}},
+                {"$limit": 50},
+                {"$project": _TRANSACTION_PROJECTION},
+            ],
+            "as": "transactions",
+        }},
+        {"$project": {"_id": 0, "transactions": 1}},
+    ]
+    docs = await db.users.aggregate(pipeline).to_list(1)
     
-    transactions = await db.payment_transactions.find(
-        {"user_id": str(user_doc["_id"])}
-    ).sort("created_at", -1).to_list(50)
-    
-    for transaction in transactions:
-        if "_id" in transaction:
-            transaction["_id"] = str(transaction["_id"])
+    if not docs:
+        raise HTTPException(status_code=404, detail="User not found")
     
-    return transactions
+    # Returned directly so FastAPI skips jsonable_encoder; orjson encodes the
+    # datetimes natively and _id is already decoded as a string
+    return ORJSONResponse(docs[0]["transactions"])
 
 @router.post("/subscription/cancel")
 async def cancel_subscription(
@@ -204,21 +269,25 @@ async def start_trial(
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid user data")
 
-    subscription = await SubscriptionService.get_user_subscription(user_id)
+    # The eligibility reads are independent, so issue them together. Every
+    # stored subscription carries a trial_end key, so match on a value.
+    db = await get_database()
+    subscription, existing_trial = await asyncio.gather(
+        SubscriptionService.get_user_subscription(user_id),
+        db.subscriptions.find_one(
+            {"user_id": user_id, "trial_end": {"$ne": None}},
+            projection={"_id": 1}
+        )
+    )
 
     # Check if user is eligible for trial
-    if subscription.tier != "free":
+    if subscription.tier is not SubscriptionTier.FREE:
         raise HTTPException(
             status_code=400,
             detail="Trial only available for free tier users"
         )
 
     # Check if user has already had a trial
-    db = await get_database()
-    existing_trial = await db.subscriptions.find_one({
-        "user_id": user_id,
-        "trial_end": {"$exists": True}
-    })
 
     if existing_trial:
         raise HTTPException(
@@ -230,7 +299,7 @@ async def start_trial(
     trial_subscription = await SubscriptionService.upgrade_to_premium(
         user_id=user_id,
         billing_period=BillingPeriod.MONTHLY,
-        stripe_subscription_id=f"trial_{datetime.utcnow().timestamp()}",
+        stripe_subscription_id=f"trial_{next(_trial_counter)}_{new_id()[:8]}",
         stripe_customer_id="",
         trial_days=trial_days
     )
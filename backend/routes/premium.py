@@ -1,20 +1,25 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import List, Optional, Dict, Any
+from fastapi.responses import Response, StreamingResponse
+from typing import List, Literal, Optional, Dict, Any
+import asyncio
+import csv
+import heapq
 import logging
+import orjson
 from datetime import datetime, timedelta
-from io import BytesIO
-import json
+from io import BytesIO, StringIO
+from itertools import islice
+from operator import itemgetter
 
 from models.simulation import SimulationResult, TimelinePoint
-from models.subscription import SubscriptionTier
+from models.subscription import SubscriptionTier, TIER_LIMITS
 from database import get_database
-from auth import get_current_user
+from auth import get_current_user, get_current_user_doc
+from utils.ids import new_id
 from services.subscription_service import SubscriptionService
 from middleware.premium_auth import (
     require_premium_subscription,
-    require_advanced_simulation_access,
     require_custom_scenario_access,
-    require_risk_assessment_access,
     premium_feature,
     usage_limited
 )
@@ -22,6 +27,71 @@ from middleware.premium_auth import (
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/premium", tags=["premium"])
 
+# Static for every premium user; serialized once at import
+_PRIORITY_SUPPORT_BODY = orjson.dumps({
+    "support_tier": "priority",
+    "response_time": "Within 2 hours during business hours",
+    "channels": ["email", "chat", "phone"],
+    "dedicated_support": True,
+    "contact_info": {
+        "email": "premium-support@parallax.com",
+        "chat": "Available in dashboard",
+        "phone": "+1-555-PREMIUM"
+    },
+    "features": [
+        "Priority ticket handling",
+        "Direct access to senior support team",
+        "Video call support available",
+        "Custom integration assistance"
+    ]
+})
+
+# Export formats each tier may use, as sets for the per-request check
+_EXPORT_FORMATS = {tier: frozenset(limits.export_formats) for tier, limits in TIER_LIMITS.items()}
+
+_CSV_HEADER = ("id", "choice_a_title", "choice_b_title", "created_at", "summary")
+_CSV_PROJECTION = {"_id": 0, "id": 1, "choice_a.title": 1, "choice_b.title": 1, "created_at": 1, "summary": 1}
+
+def _count_by_category(choice: str) -> List[Dict[str, Any]]:
+    """$facet branch counting simulations per category of one choice"""
+    return [{"$group": {"_id": {"$ifNull": [f"{choice}.category", "other"]}, "n": {"$sum": 1}}}]
+
+def _average_happiness(choice: str, timeline: str, stored: str) -> Dict[str, List[Dict[str, Any]]]:
+    """$facet branches totalling per-simulation happiness means for one choice, per title
+
+    New documents carry the mean in `stored`; older ones fall back to
+    averaging their timeline points.
+    """
+    return {
+        f"{stored}_stored": [
+            {"$match": {stored: {"$ne": None}}},
+            {"$group": {"_id": f"{choice}.title", "total": {"$sum": f"${stored}"}, "n": {"$sum": 1}}}
+        ],
+        f"{stored}_legacy": [
+            {"$match": {stored: None}},
+            {"$unwind": timeline},
+            {"$group": {
+                "_id": "$_id",
+                "title": {"$first": f"{choice}.title"},
+                "avg": {"$avg": {"$ifNull": [f"{timeline}.happiness_score", 0]}}
+            }},
+            {"$group": {"_id": "$title", "total": {"$sum": "$avg"}, "n": {"$sum": 1}}}
+        ]
+    }
+
+async def _stream_simulations_csv(cursor):
+    """Yield a CSV export one row at a time as the cursor is read"""
+    buf = StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(_CSV_HEADER)
+    yield buf.getvalue()
+
+    async for sim in cursor:
+        buf.seek(0)
+        buf.truncate(0)
+        writer.writerow((sim["id"], sim["choice_a"]["title"], sim["choice_b"]["title"], sim["created_at"], sim["summary"]))
+        yield buf.getvalue()
+
 @router.get("/subscription/status")
 async def get_subscription_status(
     current_user: dict = Depends(get_current_user)
@@ -42,7 +112,7 @@ async def get_subscription_status(
 @premium_feature("advanced_simulation")
 async def create_advanced_simulation(
     request: Dict[str, Any],
-    current_user: dict = Depends(require_advanced_simulation_access)
+    current_user: dict = Depends(get_current_user)
 ):
     """Create advanced simulation with premium features"""
     # Enhanced simulation logic with premium features
@@ -64,14 +134,14 @@ async def create_advanced_simulation(
     return {
         "message": "Advanced simulation created",
         "features_included": enhanced_request["advanced_features"],
-        "simulation_id": "advanced_" + str(datetime.utcnow().timestamp())
+        "simulation_id": f"advanced_{new_id()}"
     }
 
 @router.post("/simulations/risk-assessment")
 @usage_limited("risk_assessment")
 async def create_risk_assessment(
     request: Dict[str, Any],
-    current_user: dict = Depends(require_risk_assessment_access)
+    current_user: dict = Depends(get_current_user)
 ):
     """Create risk assessment for simulation (3 per week for free users)"""
     # Risk assessment logic
@@ -90,7 +160,7 @@ async def create_risk_assessment(
 
     return {
         "message": "Risk assessment created",
-        "assessment_id": "risk_" + str(datetime.utcnow().timestamp()),
+        "assessment_id": f"risk_{new_id()}",
         "risk_factors_analyzed": assessment_request["risk_features"],
         "confidence_score": 0.85  # Example confidence score
     }
@@ -99,14 +169,14 @@ async def create_risk_assessment(
 @premium_feature("custom_scenarios")
 async def create_custom_scenario(
     scenario_data: Dict[str, Any],
-    current_user: dict = Depends(require_custom_scenario_access)
+    current_user: dict = Depends(get_current_user)
 ):
     """Create custom simulation scenarios (premium feature)"""
     db = await get_database()
     user_id = current_user.get("clerk_id")
 
     custom_scenario = {
-        "id": f"custom_{datetime.utcnow().timestamp()}",
+        "id": f"custom_{new_id()}",
         "user_id": user_id,
         "title": scenario_data.get("title"),
         "description": scenario_data.get("description"),
@@ -133,55 +203,50 @@ async def get_custom_scenarios(
     db = await get_database()
     user_id = current_user.get("clerk_id")
 
-    scenarios = await db.custom_scenarios.find({
-        "$or": [
-            {"user_id": user_id},
-            {"is_public": True}
-        ]
-    }).sort("created_at", -1).to_list(100)
-
-    # Convert ObjectId to string
-    for scenario in scenarios:
-        if "_id" in scenario:
-            scenario["_id"] = str(scenario["_id"])
+    # One indexed range scan per branch of "own OR public", newest first,
+    # then merge the two sorted pages
+    own, public = await asyncio.gather(
+        db.custom_scenarios.find({"user_id": user_id}).sort("created_at", -1).limit(100).to_list(100),
+        db.custom_scenarios.find(
+            {"is_public": True, "user_id": {"$ne": user_id}}
+        ).sort("created_at", -1).limit(100).to_list(100)
+    )
 
-    return scenarios
+    return list(islice(heapq.merge(own, public, key=itemgetter("created_at"), reverse=True), 100))
 
 @router.get("/simulations/export")
 async def export_simulations(
-    format: str = Query(..., regex="^(json|pdf|csv|excel)$"),
+    format: Literal["json", "pdf", "csv", "excel"] = Query(...),
     limit: int = Query(50, ge=1, le=500),
-    current_user: dict = Depends(require_premium_subscription)
+    current_user: dict = Depends(require_premium_subscription),
+    user_doc: dict = Depends(get_current_user_doc)
 ):
     """Export simulation data in various formats (premium feature)"""
     db = await get_database()
-    user_doc = await db.users.find_one({"clerk_id": current_user["clerk_id"]})
-
-    if not user_doc:
-        raise HTTPException(status_code=404, detail="User not found")
 
     # Check if user has access to this export format
-    subscription = await SubscriptionService.get_user_subscription(current_user.get("clerk_id"))
-    from models.subscription import TIER_LIMITS
-    allowed_formats = TIER_LIMITS[subscription.tier].export_formats
-
-    if format not in allowed_formats:
+    subscription = await SubscriptionService.get_cached_subscription(current_user.get("clerk_id"))
+    if format not in _EXPORT_FORMATS[subscription.tier]:
         raise HTTPException(
             status_code=403,
             detail=f"Export format '{format}' not available in {subscription.tier} tier"
         )
 
+    query = {"user_id": user_doc["_id"]}
+
+    if format == "csv":
+        # Stream rows straight from the cursor instead of buffering the export
+        cursor = db.simulations.find(query, projection=_CSV_PROJECTION).sort("created_at", -1).limit(limit)
+        return StreamingResponse(
+            _stream_simulations_csv(cursor),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=simulations.csv"}
+        )
+
     # Get user simulations
-    simulations = await db.simulations.find(
-        {"user_id": str(user_doc["_id"])}
-    ).sort("created_at", -1).limit(limit).to_list(limit)
+    simulations = await db.simulations.find(query).sort("created_at", -1).limit(limit).to_list(limit)
 
     if format == "json":
-        # Convert ObjectId to string for JSON serialization
-        for sim in simulations:
-            if "_id" in sim:
-                sim["_id"] = str(sim["_id"])
-
         return {
             "format": "json",
             "count": len(simulations),
@@ -189,19 +254,6 @@ async def export_simulations(
             "exported_at": datetime.utcnow()
         }
 
-    elif format == "csv":
-        # Simplified CSV export - in production you'd use pandas or csv module
-        csv_data = "id,choice_a_title,choice_b_title,created_at,summary\n"
-        for sim in simulations:
-            csv_data += f"{sim['id']},{sim['choice_a']['title']},{sim['choice_b']['title']},{sim['created_at']},{sim['summary']}\n"
-
-        return {
-            "format": "csv",
-            "count": len(simulations),
-            "data": csv_data,
-            "exported_at": datetime.utcnow()
-        }
-
     else:
         # For PDF and Excel, you'd implement proper generation
         return {
@@ -214,51 +266,51 @@ async def export_simulations(
 @router.get("/analytics/dashboard")
 async def get_premium_analytics(
     period_days: int = Query(30, ge=1, le=365),
-    current_user: dict = Depends(require_premium_subscription)
+    current_user: dict = Depends(require_premium_subscription),
+    user_doc: dict = Depends(get_current_user_doc)
 ):
     """Get premium analytics dashboard data"""
     db = await get_database()
-    user_doc = await db.users.find_one({"clerk_id": current_user["clerk_id"]})
-
-    if not user_doc:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    user_id = str(user_doc["_id"])
+    user_id = user_doc["_id"]
     start_date = datetime.utcnow() - timedelta(days=period_days)
 
-    # Get simulation statistics
-    simulations = await db.simulations.find({
-        "user_id": user_id,
-        "created_at": {"$gte": start_date}
-    }).to_list(1000)
+    # Roll the simulations up server-side; only the aggregates come back
+    docs = await db.simulations.aggregate([
+        {"$match": {"user_id": user_id, "created_at": {"$gte": start_date}}},
+        {"$project": {
+            "choice_a.title": 1, "choice_a.category": 1, "avg_happiness_a": 1, "choice_a_timeline.happiness_score": 1,
+            "choice_b.title": 1, "choice_b.category": 1, "avg_happiness_b": 1, "choice_b_timeline.happiness_score": 1
+        }},
+        {"$facet": {
+            "total": [{"$count": "n"}],
+            "by_category_a": _count_by_category("$choice_a"),
+            "by_category_b": _count_by_category("$choice_b"),
+            **_average_happiness("$choice_a", "$choice_a_timeline", "avg_happiness_a"),
+            **_average_happiness("$choice_b", "$choice_b_timeline", "avg_happiness_b")
+        }}
+    ]).to_list(1)
+    rollup = docs[0]
 
-    # Calculate analytics
     analytics = {
         "period_days": period_days,
-        "total_simulations": len(simulations),
+        "total_simulations": rollup["total"][0]["n"] if rollup["total"] else 0,
         "simulations_by_category": {},
         "average_happiness_scores": {},
         "decision_patterns": {},
         "timeline": []
     }
 
-    # Process simulations for insights
-    for sim in simulations:
-        # Category analysis
-        cat_a = sim["choice_a"].get("category", "other")
-        cat_b = sim["choice_b"].get("category", "other")
-
-        analytics["simulations_by_category"][cat_a] = analytics["simulations_by_category"].get(cat_a, 0) + 1
-        analytics["simulations_by_category"][cat_b] = analytics["simulations_by_category"].get(cat_b, 0) + 1
+    by_category = analytics["simulations_by_category"]
+    for row in rollup["by_category_a"] + rollup["by_category_b"]:
+        by_category[row["_id"]] = by_category.get(row["_id"], 0) + row["n"]
 
-        # Happiness score analysis
-        if sim.get("choice_a_timeline"):
-            avg_happiness_a = sum(point.get("happiness_score", 0) for point in sim["choice_a_timeline"]) / len(sim["choice_a_timeline"])
-            analytics["average_happiness_scores"][sim["choice_a"]["title"]] = avg_happiness_a
-
-        if sim.get("choice_b_timeline"):
-            avg_happiness_b = sum(point.get("happiness_score", 0) for point in sim["choice_b_timeline"]) / len(sim["choice_b_timeline"])
-            analytics["average_happiness_scores"][sim["choice_b"]["title"]] = avg_happiness_b
+    happiness: Dict[str, List[float]] = {}
+    for branch in ("avg_happiness_a_stored", "avg_happiness_a_legacy", "avg_happiness_b_stored", "avg_happiness_b_legacy"):
+        for row in rollup[branch]:
+            totals = happiness.setdefault(row["_id"], [0.0, 0])
+            totals[0] += row["total"]
+            totals[1] += row["n"]
+    analytics["average_happiness_scores"] = {title: total / n for title, (total, n) in happiness.items()}
 
     return analytics
 
@@ -267,23 +319,7 @@ async def get_priority_support_info(
     current_user: dict = Depends(require_premium_subscription)
 ):
     """Get priority support information for premium users"""
-    return {
-        "support_tier": "priority",
-        "response_time": "Within 2 hours during business hours",
-        "channels": ["email", "chat", "phone"],
-        "dedicated_support": True,
-        "contact_info": {
-            "email": "premium-support@parallax.com",
-            "chat": "Available in dashboard",
-            "phone": "+1-555-PREMIUM"
-        },
-        "features": [
-            "Priority ticket handling",
-            "Direct access to senior support team",
-            "Video call support available",
-            "Custom integration assistance"
-        ]
-    }
+    return Response(_PRIORITY_SUPPORT_BODY, media_type="application/json")
 
 @router.post("/feedback/premium")
 async def submit_premium_feedback(
@@ -294,7 +330,7 @@ async def submit_premium_feedback(
     db = await get_database()
 
     feedback = {
-        "id": f"feedback_{datetime.utcnow().timestamp()}",
+        "id": f"feedback_{new_id()}",
         "user_id": current_user.get("clerk_id"),
         "type": "premium_feedback",
         "category": feedback_data.get("category"),
@@ -1,7 +1,6 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends
 from typing import List, Optional
 import logging
-import json
 import re
 from datetime import datetime, timedelta
 
@@ -10,20 +9,44 @@ from database import get_database
 from auth import get_current_user
 from services.ai_service import generate_life_simulation
 from services.subscription_service import SubscriptionService
-from middleware.premium_auth import require_simulation_access, usage_limited
+from middleware.premium_auth import usage_limited
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["simulation"])
 
+# Fields read back into SimulationResult; the choices and user context stay in Mongo
+_RESULT_PROJECTION = {
+    "_id": 0, "id": 1, "choice_a_timeline": 1, "choice_b_timeline": 1, "summary": 1, "created_at": 1
+}
+
+async def _store_simulation(db, simulation_doc: dict, usage_user_id: str) -> None:
+    """Persist a generated simulation after its response has been sent"""
+    try:
+        await db.simulations.insert_one(simulation_doc)
+    except Exception as e:
+        logger.error(f"Failed to store simulation {simulation_doc['id']}: {e}")
+        # Usage was consumed before the handler ran; don't charge for a
+        # simulation that was never saved
+        try:
+            await SubscriptionService.release_usage(usage_user_id, "simulation")
+        except Exception as release_error:
+            logger.error(f"Failed to release simulation usage for {usage_user_id}: {release_error}")
+
 @router.post("/simulate", response_model=SimulationResult)
 @usage_limited("simulation")
 async def create_life_simulation(
     request: SimulationRequest,
-    current_user: Optional[dict] = Depends(require_simulation_access)
+    background_tasks: BackgroundTasks,
+    current_user: Optional[dict] = Depends(get_current_user)
 ):
-    """Generate AI-powered life simulation comparing two choices"""
+    """Generate AI-powered life simulation comparing two choices
+
+    The simulation is stored after the response is sent, so a read of
+    /simulation/{id} issued immediately afterwards can still return 404.
+    """
     logger.info(f"Received simulation request: {request}")
-    logger.debug(f"Request dict: {request.dict()}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Request dict: {request.model_dump()}")
 
     db = await get_database()
     user_id = current_user.get("clerk_id") if current_user else None
@@ -31,6 +54,7 @@ async def create_life_simulation(
     try:
         ai_data = await generate_life_simulation(request)
         
+        now = datetime.utcnow()
         simulation = Simulation(
             user_id=user_id,
             choice_a=request.choice_a,
@@ -38,13 +62,16 @@ async def create_life_simulation(
             user_context=request.user_context or UserContext(),
             choice_a_timeline=[TimelinePoint(**point) for point in ai_data["choice_a_timeline"]],
             choice_b_timeline=[TimelinePoint(**point) for point in ai_data["choice_b_timeline"]],
-            summary=ai_data.get("summary", "Simulation completed successfully.")
+            summary=ai_data.get("summary", "Simulation completed successfully."),
+            created_at=now,
+            updated_at=now
         )
         
         
-        simulation_dict = simulation.dict()
-        result = await db.simulations.insert_one(simulation_dict)
-        simulation_dict["_id"] = str(result.inserted_id)
+        # The response doesn't depend on the write, so store it afterwards
+        background_tasks.add_task(
+            _store_simulation, db, simulation.model_dump(), current_user.get("user_id")
+        )
         
         logger.info(f"Simulation created with ID: {simulation.id}")
         
@@ -71,14 +98,17 @@ async def get_user_simulations(current_user: dict = Depends(get_current_user)):
     clerk_id = current_user["clerk_id"]
 
     simulations = await db.simulations.find(
-        {"user_id": clerk_id}
+        {"user_id": clerk_id},
+        projection=_RESULT_PROJECTION
     ).sort("created_at", -1).limit(50).to_list(50)
     
+    # Stored documents were validated on write, and response_model checks the
+    # output again, so build the results without a second validation pass
     return [
-        SimulationResult(
+        SimulationResult.model_construct(
             id=sim["id"],
-            choice_a_timeline=[TimelinePoint(**point) for point in sim["choice_a_timeline"]],
-            choice_b_timeline=[TimelinePoint(**point) for point in sim["choice_b_timeline"]],
+            choice_a_timeline=[TimelinePoint.model_construct(**point) for point in sim["choice_a_timeline"]],
+            choice_b_timeline=[TimelinePoint.model_construct(**point) for point in sim["choice_b_timeline"]],
             summary=sim["summary"],
             created_at=sim["created_at"]
         )
@@ -108,8 +138,4 @@ async def get_simulation(
         if not simulation.get("is_public", False):
             raise HTTPException(status_code=403, detail="Access denied")
     
-    
-    if "_id" in simulation:
-        simulation["_id"] = str(simulation["_id"])
-    
     return simulation
\ No newline at end of file
@@ -10,7 +10,7 @@ from dotenv import load_dotenv
 load_dotenv(Path(__file__).resolve().parent.parent / ".env")
 
 from motor.motor_asyncio import AsyncIOMotorClient
-from database import db
+from database import get_database
 from models.simulation import (
     SimulationRequest,
     LifeChoice,
@@ -44,6 +44,7 @@ DEMO_REQUEST = SimulationRequest(
 
 
 async def seed() -> None:
+    db = await get_database()
     deleted = await db.simulations.delete_many({"is_demo": True})
     if deleted.deleted_count:
         logger.info(f"Removed {deleted.deleted_count} previous demo simulation(s)")
@@ -1,16 +1,17 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 from pydantic import ValidationError
 import logging
+import orjson
 from pathlib import Path
 from dotenv import load_dotenv
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-from config import CORS_ORIGINS, API_TITLE, API_VERSION, SERVER_HOST, SERVER_PORT
+from config import CORS_ORIGINS, API_TITLE, API_VERSION, SERVER_HOST, SERVER_PORT, DEBUG_MODE
 from routes.auth import router as auth_router
 from routes.simulation import router as simulation_router
 from routes.payments import router as payments_router
@@ -18,42 +19,51 @@ from routes.premium import router as premium_router
 from routes.ml_scenarios import router as ml_scenarios_router
 from routes.demo import router as demo_router
 from database import init_database, close_database
+from auth import prefetch_jwks
+from services.ai_service import close_openai_client, warmup_openai_client
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title=API_TITLE, version=API_VERSION)
+app = FastAPI(title=API_TITLE, version=API_VERSION, default_response_class=ORJSONResponse)
+
+# The health endpoints return constant bodies, so they are serialized once
+_ROOT_BODY = orjson.dumps({"message": API_TITLE, "version": API_VERSION, "status": "healthy"})
+_HEALTH_BODY = orjson.dumps({"status": "healthy", "service": API_TITLE, "version": API_VERSION})
 
 logger.info(f"CORS origins configured: {CORS_ORIGINS}")
 
-@app.middleware("http")
 async def log_requests(request: Request, call_next):
-    if request.method == "OPTIONS":
-        response = await call_next(request)
-        return response
-
-    if request.url.path == "/api/simulate":
-        logger.info(f"Request method: {request.method}")
-        logger.info(f"Request path: {request.url.path}")
-        logger.info(f"Content-Type: {request.headers.get('content-type')}")
-        logger.info(f"Authorization header present: {bool(request.headers.get('authorization'))}")
-
-    response = await call_next(request)
-    return response
-
+    if request.method != "OPTIONS" and request.url.path == "/api/simulate":
+        logger.info("Request method: %s", request.method)
+        logger.info("Request path: %s", request.url.path)
+        logger.info("Content-Type: %s", request.headers.get("content-type"))
+        logger.info("Authorization header present: %s", "authorization" in request.headers)
+
+    return await call_next(request)
+
+# Request tracing is a debugging aid; in production the app runs without
+# the extra middleware layer
+if DEBUG_MODE:
+    app.middleware("http")(log_requests)
+
+# Starlette keeps allow_origins as given and checks each request's Origin
+# with `in`, so hand it a set. Preflights are cached for the 2h maximum
+# browsers honour instead of Starlette's 10 minute default.
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=CORS_ORIGINS,
+    allow_origins=frozenset(CORS_ORIGINS),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    max_age=7200,
 )
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     logger.error(f"Validation error on {request.url.path}: {exc.errors()}")
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=422,
         content={
             "detail": exc.errors(),
@@ -71,7 +81,7 @@ app.include_router(demo_router, prefix="/api")
 @app.get("/api/")
 async def root():
     # API health check
-    return {"message": API_TITLE, "version": API_VERSION, "status": "healthy"}
+    return Response(_ROOT_BODY, media_type="application/json")
 
 @app.on_event("startup")
 async def startup_event():
@@ -81,6 +91,13 @@ async def startup_event():
         await init_database()
         logger.info("Database initialized successfully")
 
+        try:
+            await prefetch_jwks()
+        except Exception as e:
+            logger.warning(f"JWKS prefetch failed, keys will be fetched on first request: {e}")
+
+        await warmup_openai_client()
+
         from routes.ml_scenarios import get_scenario_service
         service = get_scenario_service()
         logger.info("ML scenario service initialized successfully")
@@ -94,17 +111,14 @@ async def shutdown_event():
     try:
         await close_database()
         logger.info("Database connections closed")
+        await close_openai_client()
     except Exception as e:
         logger.error(f"Shutdown error: {e}")
 
 @app.get("/health")
 async def health_check():
     # System health check
-    return {
-        "status": "healthy",
-        "service": API_TITLE,
-        "version": API_VERSION
-    }
+    return Response(_HEALTH_BODY, media_type="application/json")
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,9 +1,13 @@
+import asyncio
+import copy
 import openai
 import json
+import orjson
 import re
 import logging
 import random
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, Optional, Tuple
 
 from config import (
     OPENROUTER_BASE_URL,
@@ -12,6 +16,8 @@ from config import (
     LLM_TEMPERATURE,
     LLM_MAX_TOKENS_SIMULATION,
     LLM_TIMEOUT_SECONDS,
+    LLM_RESPONSE_CACHE_TTL_SECONDS,
+    LLM_MAX_CONCURRENCY,
     SALARY_VARIANCE_THRESHOLD,
     SALARY_NATURAL_VARIANCE,
 )
@@ -31,79 +37,194 @@ logger = logging.getLogger(__name__)
 ml_integration = MLIntegrationService()
 
 client = None
+# The pool handed to the SDK, kept so warm-up can use it directly
+http_client = None
+
+# Extracting the JSON payload from free-form model replies
+_JSON_MD = re.compile(r'```(?:json)?\s*(\{.*?\})\s*```', re.DOTALL)
+_JSON_BLOCK = re.compile(r'\{.*\}', re.DOTALL)
+_JSON_DECODER = json.JSONDecoder()
+
+# One upstream host, so a modest pool whose idle connections outlive the
+# SDK's 5s keepalive default; built from the SDK's own httpx types
+_HTTP_LIMITS = type(openai.DEFAULT_CONNECTION_LIMITS)(
+    max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0
+)
+_HTTP_TIMEOUT = openai.Timeout(LLM_TIMEOUT_SECONDS, connect=5.0)
+
+def _http_client():
+    """aiohttp transport when the openai[aiohttp] extra is installed, else httpx"""
+    options = {"limits": _HTTP_LIMITS, "timeout": _HTTP_TIMEOUT}
+    aiohttp_client = getattr(openai, "DefaultAioHttpClient", None)
+    if aiohttp_client is not None:
+        try:
+            return aiohttp_client(**options)
+        except RuntimeError:
+            pass
+    logger.info("aiohttp transport not available, using httpx for LLM calls")
+    return openai.DefaultAsyncHttpxClient(**options)
 
 def get_openai_client():
     """Get or create OpenAI client"""
-    global client
+    global client, http_client
     if client is None:
         if OPENROUTER_API_KEY:
-            client = openai.OpenAI(
+            http_client = _http_client()
+            client = openai.AsyncOpenAI(
                 base_url=OPENROUTER_BASE_URL,
                 api_key=OPENROUTER_API_KEY,
+                http_client=http_client,
             )
             logger.info("OpenAI client initialized successfully")
         else:
             logger.warning("OPENROUTER_API_KEY not set - AI service will use fallback data")
     return client
 
-async def generate_life_simulation(request: SimulationRequest) -> Dict[str, Any]:
-    """Generate AI-powered life simulation using AI model"""
-    
-    ai_client = get_openai_client()
-    if not ai_client:
-        logger.warning("OpenRouter API key not available, using fallback data")
-        return generate_fallback_data(request)
-    
-    try:
-        prompt = f"""Generate a realistic 10-year career progression comparison between two paths.
+# Validated LLM results keyed by the exact request, so repeat comparisons
+# skip the multi-second call. Stored serialized so callers get their own copy.
+_simulation_cache: Dict[str, Tuple[bytes, float]] = {}
+_simulation_inflight: Dict[str, "asyncio.Task[Dict[str, Any]]"] = {}
 
-**Choice A:** {request.choice_a.title}
-Description: {request.choice_a.description}
+# Bound in-flight LLM calls to what the OpenRouter key is allowed; the SDK
+# already retries 429s with backoff
+_llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+_SIMULATION_CACHE_MAX_SIZE = 1_000
 
-**Choice B:** {request.choice_b.title}  
-Description: {request.choice_b.description}
+# Everything identical across requests lives in the system message so the
+# provider can reuse its cached prefix; only the two choices vary per call
+_SIMULATION_SYSTEM_PROMPT = """You are a professional life advisor and data analyst specializing in career and life path projections.
 
-**Context:** Age {request.user_context.age or 25}, Location: {request.user_context.current_location or 'United States'}
+Generate a realistic 10-year career progression comparison between the two paths the user describes.
 
 Please create realistic salary progressions and happiness scores (1-10 scale) for each career path over 10 years. Consider typical industry standards, advancement opportunities, and work-life balance factors.
 
 Return your response as valid JSON only:
 
-{{
+{
   "choice_a_timeline": [
-    {{"year": 1, "salary": [realistic_starting_salary], "happiness_score": [1-10], "major_event": "[career milestone]", "location": "{request.user_context.current_location or 'City'}", "career_title": "[job title]"}},
+    {"year": 1, "salary": [realistic_starting_salary], "happiness_score": [1-10], "major_event": "[career milestone]", "location": "[user's location]", "career_title": "[job title]"},
     [... continue for years 2-10 with realistic progression ...]
   ],
   "choice_b_timeline": [
-    {{"year": 1, "salary": [realistic_starting_salary], "happiness_score": [1-10], "major_event": "[career milestone]", "location": "{request.user_context.current_location or 'City'}", "career_title": "[job title]"}},
+    {"year": 1, "salary": [realistic_starting_salary], "happiness_score": [1-10], "major_event": "[career milestone]", "location": "[user's location]", "career_title": "[job title]"},
     [... continue for years 2-10 with realistic progression ...]
   ],
   "summary": "[200+ character comparison highlighting key differences, trade-offs, and considerations for choosing between these paths]"
-}}"""
+}"""
+
+def _get_cached_simulation(key: str) -> Optional[Dict[str, Any]]:
+    entry = _simulation_cache.get(key)
+    if entry and entry[1] > time.monotonic():
+        return orjson.loads(entry[0])
+    return None
+
+def _cache_simulation(key: str, ai_data: Dict[str, Any]) -> None:
+    try:
+        payload = orjson.dumps(ai_data, option=orjson.OPT_SERIALIZE_NUMPY)
+    except TypeError as e:
+        logger.warning(f"Simulation result not cacheable: {e}")
+        return
+
+    if len(_simulation_cache) >= _SIMULATION_CACHE_MAX_SIZE:
+        _simulation_cache.clear()
+    _simulation_cache[key] = (payload, time.monotonic() + LLM_RESPONSE_CACHE_TTL_SECONDS)
+
+async def warmup_openai_client():
+    """Open a pooled connection to the LLM host so the first simulation skips the handshake"""
+    ai_client = get_openai_client()
+    if ai_client is None or http_client is None:
+        return
+
+    try:
+        await asyncio.wait_for(http_client.head(str(ai_client.base_url)), timeout=5.0)
+        logger.info("LLM connection warmed up")
+    except Exception as e:
+        logger.warning(f"LLM connection warm-up failed, first call will connect: {e}")
+
+async def close_openai_client():
+    """Close the shared client's connection pool"""
+    global client, http_client
+    if client is not None:
+        await client.close()
+        client = None
+        http_client = None
+
+async def generate_life_simulation(request: SimulationRequest) -> Dict[str, Any]:
+    """Generate AI-powered life simulation using AI model"""
+    
+    ai_client = get_openai_client()
+    if not ai_client:
+        logger.warning("OpenRouter API key not available, using fallback data")
+        return generate_fallback_data(request)
+
+    cache_key = request.model_dump_json()
+    cached = _get_cached_simulation(cache_key)
+    if cached is not None:
+        logger.info("Serving simulation from LLM response cache")
+        return cached
+
+    # Identical requests arriving while a call is in flight share its result,
+    # fallback included, instead of issuing their own. The call runs as a task
+    # so a disconnecting caller does not cancel it for the others.
+    inflight = _simulation_inflight.get(cache_key)
+    if inflight is not None:
+        return copy.deepcopy(await asyncio.shield(inflight))
+
+    task = asyncio.ensure_future(_simulate_once(ai_client, request, cache_key))
+    _simulation_inflight[cache_key] = task
+    return await asyncio.shield(task)
+
+async def _simulate_once(ai_client, request: SimulationRequest, cache_key: str) -> Dict[str, Any]:
+    """Run the shared in-flight call and release its slot however it ends"""
+    try:
+        return await _simulate_with_llm(ai_client, request, cache_key)
+    finally:
+        _simulation_inflight.pop(cache_key, None)
+
+async def _stream_completion(ai_client, messages) -> str:
+    """Stream a chat completion and return the concatenated content"""
+    # Deltas are consumed as they are generated rather than buffered into a
+    # single response body; the caller's timeout covers the whole stream
+    stream = await ai_client.chat.completions.create(
+        model=LLM_MODEL_PRIMARY,
+        messages=messages,
+        temperature=LLM_TEMPERATURE,
+        max_tokens=LLM_MAX_TOKENS_SIMULATION,
+        stream=True
+    )
+    parts = []
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+    return "".join(parts)
+
+async def _simulate_with_llm(ai_client, request: SimulationRequest, cache_key: str) -> Dict[str, Any]:
+    """Run the LLM call for one request, falling back to generated data on failure"""
+    try:
+        prompt = f"""**Choice A:** {request.choice_a.title}
+Description: {request.choice_a.description}
+
+**Choice B:** {request.choice_b.title}
+Description: {request.choice_b.description}
+
+**Context:** Age {request.user_context.age or 25}, Location: {request.user_context.current_location or 'United States'}"""
         
         logger.info("Making OpenRouter API call...")
 
-        import asyncio
         try:
-            response = await asyncio.wait_for(
-                asyncio.to_thread(
-                    ai_client.chat.completions.create,
-                    model=LLM_MODEL_PRIMARY,
-                    messages=[
-                        {"role": "system", "content": "You are a professional life advisor and data analyst specializing in career and life path projections."},
+            async with _llm_semaphore:
+                ai_content = await asyncio.wait_for(
+                    _stream_completion(ai_client, [
+                        {"role": "system", "content": _SIMULATION_SYSTEM_PROMPT},
                         {"role": "user", "content": prompt}
-                    ],
-                    temperature=LLM_TEMPERATURE,
-                    max_tokens=LLM_MAX_TOKENS_SIMULATION
-                ),
-                timeout=LLM_TIMEOUT_SECONDS
-            )
+                    ]),
+                    timeout=LLM_TIMEOUT_SECONDS
+                )
             logger.info("OpenRouter API call successful")
         except asyncio.TimeoutError:
             logger.error(" OpenRouter API call timed out after 45 seconds")
             raise Exception("API call timed out")
         
-        ai_content = response.choices[0].message.content
         logger.info(f"AI response received, length: {len(ai_content)}")
         logger.info(f"AI response preview: {ai_content[:200]}...")
         
@@ -126,38 +247,48 @@ Return your response as valid JSON only:
         ai_data = None
         
         try:
-            ai_data = json.loads(ai_content.strip())
+            ai_data = orjson.loads(ai_content)
             logger.info("Successfully parsed AI response as direct JSON")
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.debug(f"Direct JSON parsing failed: {e}")
             pass
         
         if ai_data is None:
-            json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', ai_content, re.DOTALL)
+            json_match = _JSON_MD.search(ai_content)
             if json_match:
                 try:
                     json_str = json_match.group(1).strip()
-                    ai_data = json.loads(json_str)
+                    ai_data = orjson.loads(json_str)
                     logger.info("Successfully parsed AI response from markdown code block")
-                except json.JSONDecodeError as e:
+                except orjson.JSONDecodeError as e:
                     logger.warning(f"Markdown JSON parsing failed: {e}")
                     pass
         
         if ai_data is None:
-            json_match = re.search(r'\{.*\}', ai_content, re.DOTALL)
-            if json_match:
-                try:
-                    ai_data = json.loads(json_match.group())
-                    logger.info("Successfully parsed AI response from JSON pattern")
-                except json.JSONDecodeError as e:
-                    logger.warning(f"JSON pattern parsing failed: {e}")
-                    pass
-            else:
+            start = ai_content.find('{')
+            if start == -1:
                 logger.warning("No JSON pattern found in AI response")
+            else:
+                # A single forward decode finds the first complete object; the
+                # greedy first-to-last-brace match is kept as a fallback
+                try:
+                    ai_data, _ = _JSON_DECODER.raw_decode(ai_content, start)
+                    logger.info("Successfully parsed AI response from embedded JSON object")
+                except json.JSONDecodeError:
+                    json_match = _JSON_BLOCK.search(ai_content, start)
+                    if json_match:
+                        try:
+                            ai_data = orjson.loads(json_match.group())
+                            logger.info("Successfully parsed AI response from JSON pattern")
+                        except orjson.JSONDecodeError as e:
+                            logger.warning(f"JSON pattern parsing failed: {e}")
+                    else:
+                        logger.warning("No JSON pattern found in AI response")
         
         if ai_data:
             # Validate and adjust AI predictions against known salary ranges
             ai_data = validate_ai_predictions(ai_data, request)
+            _cache_simulation(cache_key, ai_data)
             return ai_data
         else:
             logger.warning(f" Failed to parse AI response with all methods, using fallback data")
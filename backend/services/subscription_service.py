@@ -1,7 +1,10 @@
+import asyncio
 import logging
+import time
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple, NamedTuple
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import InsertOne, ReturnDocument, UpdateMany
 
 from models.subscription import (
     Subscription, SubscriptionTier, SubscriptionStatus, BillingPeriod,
@@ -11,6 +14,40 @@ from database import get_database
 
 logger = logging.getLogger(__name__)
 
+# Short-lived cache of subscription state so the auth dependency and the
+# usage checks in one request (or a burst of requests) share one lookup.
+_subscription_cache: Dict[str, Tuple[Subscription, float]] = {}
+_subscription_locks: Dict[str, asyncio.Lock] = {}
+_SUBSCRIPTION_CACHE_TTL = 30  # seconds
+_SUBSCRIPTION_CACHE_MAX_SIZE = 10_000
+
+# Analytics are polled by the dashboard; serve repeats for a few seconds.
+# Entries are dropped whenever the user's subscription or usage changes.
+_analytics_cache: Dict[str, Tuple[Dict[str, Any], float]] = {}
+_ANALYTICS_CACHE_TTL = 5  # seconds
+
+# Weekly-metered features: feature -> (usage counter, tier limit, label)
+_METERED_FEATURES = {
+    "simulation": ("simulations_used", "simulations_per_week", "simulations"),
+    "risk_assessment": ("risk_assessments_used", "risk_assessments_per_week", "risk assessments"),
+    "ml_prediction": ("ml_predictions_used", "ml_predictions_per_week", "ML predictions"),
+    "ml_insights": ("ml_insights_used", "ml_insights_per_week", "ML insights"),
+}
+
+# Tier-gated features: feature -> (UsageLimit flag, denial reason)
+_GATED_FEATURES = {
+    "advanced_simulation": ("advanced_simulations", "Advanced simulations require premium subscription"),
+    "ai_chatbot": ("ai_chatbot_access", "AI chatbot requires premium subscription"),
+    "custom_scenarios": ("custom_scenarios", "Custom scenarios require premium subscription"),
+}
+
+class UsageDecision(NamedTuple):
+    """Outcome of a feature access / usage check"""
+    allowed: bool
+    reason: Optional[str]
+    tier: str
+    usage_info: Optional[Dict[str, Any]] = None
+
 class SubscriptionService:
     """Service for managing user subscriptions and premium features"""
 
@@ -25,28 +62,57 @@ class SubscriptionService:
         )
 
         if subscription_doc:
-            
-            if "_id" in subscription_doc:
-                subscription_doc["_id"] = str(subscription_doc["_id"])
             return Subscription(**subscription_doc)
 
         # create default free subscription if none exists
         return await SubscriptionService.create_free_subscription(user_id)
 
+    @staticmethod
+    async def get_cached_subscription(user_id: str) -> Subscription:
+        """Get user's subscription, served from a short TTL cache when fresh"""
+        entry = _subscription_cache.get(user_id)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+
+        lock = _subscription_locks.setdefault(user_id, asyncio.Lock())
+        try:
+            async with lock:
+                entry = _subscription_cache.get(user_id)
+                if entry and entry[1] > time.monotonic():
+                    return entry[0]
+
+                subscription = await SubscriptionService.get_user_subscription(user_id)
+
+                if len(_subscription_cache) >= _SUBSCRIPTION_CACHE_MAX_SIZE:
+                    _subscription_cache.clear()
+                _subscription_cache[user_id] = (subscription, time.monotonic() + _SUBSCRIPTION_CACHE_TTL)
+        finally:
+            _subscription_locks.pop(user_id, None)
+        return subscription
+
+    @staticmethod
+    def invalidate_user(user_id: str) -> None:
+        """Drop cached subscription state after it has been mutated"""
+        _subscription_cache.pop(user_id, None)
+        _analytics_cache.pop(user_id, None)
+
     @staticmethod
     async def create_free_subscription(user_id: str) -> Subscription:
         """Create a default free subscription for new users"""
         db = await get_database()
 
+        now = datetime.utcnow()
         subscription = Subscription(
             user_id=user_id,
             tier=SubscriptionTier.FREE,
             status=SubscriptionStatus.ACTIVE,
-            current_period_start=datetime.utcnow(),
-            current_period_end=datetime.utcnow() + timedelta(days=365)  # So the free tier doesn't expire
+            current_period_start=now,
+            current_period_end=now + timedelta(days=365),  # So the free tier doesn't expire
+            created_at=now,
+            updated_at=now
         )
 
-        await db.subscriptions.insert_one(subscription.dict())
+        await db.subscriptions.insert_one(subscription.model_dump())
         logger.info(f"Created free subscription for user {user_id}")
 
         return subscription
@@ -85,23 +151,28 @@ class SubscriptionService:
             stripe_customer_id=stripe_customer_id,
             current_period_start=start_date,
             current_period_end=end_date,
-            trial_end=trial_end
-        )
-
-        # Deactivate previous subscriptions
-        await db.subscriptions.update_many(
-            {"user_id": user_id, "status": SubscriptionStatus.ACTIVE},
-            {"$set": {"status": SubscriptionStatus.INACTIVE, "updated_at": datetime.utcnow()}}
+            trial_end=trial_end,
+            created_at=start_date,
+            updated_at=start_date
         )
 
-        # Insert new subscription
-        await db.subscriptions.insert_one(subscription.dict())
-
-        # Update user tier in users collection for backward compatibility
-        await db.users.update_one(
-            {"_id": user_id},
-            {"$set": {"subscription_tier": "premium", "upgraded_at": datetime.utcnow()}}
+        # Deactivate previous subscriptions and insert the new one in a single
+        # ordered batch; the user tier (kept for backward compatibility) is
+        # written alongside it, and only once.
+        await asyncio.gather(
+            db.subscriptions.bulk_write([
+                UpdateMany(
+                    {"user_id": user_id, "status": SubscriptionStatus.ACTIVE},
+                    {"$set": {"status": SubscriptionStatus.INACTIVE, "updated_at": start_date}}
+                ),
+                InsertOne(subscription.model_dump())
+            ], ordered=True),
+            db.users.update_one(
+                {"_id": user_id, "subscription_tier": {"$ne": "premium"}},
+                {"$set": {"subscription_tier": "premium", "upgraded_at": start_date}}
+            )
         )
+        SubscriptionService.invalidate_user(user_id)
 
         logger.info(f"Upgraded user {user_id} to premium subscription")
         return subscription
@@ -115,14 +186,15 @@ class SubscriptionService:
         if not subscription:
             return False
 
+        now = datetime.utcnow()
         update_data = {
-            "cancelled_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
+            "cancelled_at": now,
+            "updated_at": now
         }
 
         if immediate:
             update_data["status"] = SubscriptionStatus.CANCELLED
-            update_data["current_period_end"] = datetime.utcnow()
+            update_data["current_period_end"] = now
         else:
             # Let it expire at the end of current period
             update_data["status"] = SubscriptionStatus.CANCELLED
@@ -131,101 +203,41 @@ class SubscriptionService:
             {"user_id": user_id, "id": subscription.id},
             {"$set": update_data}
         )
+        SubscriptionService.invalidate_user(user_id)
 
         logger.info(f"Cancelled subscription for user {user_id}")
         return True
 
     @staticmethod
-    async def check_usage_limits(user_id: str, feature: str) -> Dict[str, Any]:
+    async def check_usage_limits(user_id: str, feature: str) -> UsageDecision:
         """Check if user can use a specific feature based on their subscription"""
-        subscription = await SubscriptionService.get_user_subscription(user_id)
+        subscription = await SubscriptionService.get_cached_subscription(user_id)
         limits = TIER_LIMITS[subscription.tier]
 
-        result = {
-            "allowed": True,
-            "reason": None,
-            "tier": subscription.tier,
-            "usage_info": {}
-        }
+        if feature in _GATED_FEATURES:
+            flag, reason = _GATED_FEATURES[feature]
+            if not getattr(limits, flag):
+                return UsageDecision(False, reason, subscription.tier)
 
-        if feature == "simulation":
-            if limits.simulations_per_week is not None:
-                # Check current week usage
-                usage = await SubscriptionService.get_current_usage(user_id)
-                if usage.simulations_used >= limits.simulations_per_week:
-                    result["allowed"] = False
-                    result["reason"] = f"Weekly limit of {limits.simulations_per_week} simulations reached"
-
-                result["usage_info"] = {
-                    "used": usage.simulations_used,
-                    "limit": limits.simulations_per_week,
-                    "remaining": limits.simulations_per_week - usage.simulations_used
-                }
-
-        elif feature == "risk_assessment":
-            if limits.risk_assessments_per_week is not None:
-                # Check current week usage
-                usage = await SubscriptionService.get_current_usage(user_id)
-                if usage.risk_assessments_used >= limits.risk_assessments_per_week:
-                    result["allowed"] = False
-                    result["reason"] = f"Weekly limit of {limits.risk_assessments_per_week} risk assessments reached"
-
-                result["usage_info"] = {
-                    "used": usage.risk_assessments_used,
-                    "limit": limits.risk_assessments_per_week,
-                    "remaining": limits.risk_assessments_per_week - usage.risk_assessments_used
-                }
-
-        elif feature == "advanced_simulation":
-            if not limits.advanced_simulations:
-                result["allowed"] = False
-                result["reason"] = "Advanced simulations require premium subscription"
-
-        elif feature == "ai_chatbot":
-            if not limits.ai_chatbot_access:
-                result["allowed"] = False
-                result["reason"] = "AI chatbot requires premium subscription"
-
-        elif feature == "custom_scenarios":
-            if not limits.custom_scenarios:
-                result["allowed"] = False
-                result["reason"] = "Custom scenarios require premium subscription"
-
-        elif feature == "ml_prediction":
-            if limits.ml_predictions_per_week is not None:
-                # Check current week usage
-                usage = await SubscriptionService.get_current_usage(user_id)
-                if usage.ml_predictions_used >= limits.ml_predictions_per_week:
-                    result["allowed"] = False
-                    result["reason"] = f"Weekly limit of {limits.ml_predictions_per_week} ML predictions reached"
-
-                result["usage_info"] = {
-                    "used": usage.ml_predictions_used,
-                    "limit": limits.ml_predictions_per_week,
-                    "remaining": limits.ml_predictions_per_week - usage.ml_predictions_used
-                }
-
-        elif feature == "ml_insights":
-            if limits.ml_insights_per_week is not None:
+        elif feature in _METERED_FEATURES:
+            counter, limit_attr, label = _METERED_FEATURES[feature]
+            limit = getattr(limits, limit_attr)
+            if limit is not None:
                 # Check current week usage
                 usage = await SubscriptionService.get_current_usage(user_id)
-                if usage.ml_insights_used >= limits.ml_insights_per_week:
-                    result["allowed"] = False
-                    result["reason"] = f"Weekly limit of {limits.ml_insights_per_week} ML insights reached"
-
-                result["usage_info"] = {
-                    "used": usage.ml_insights_used,
-                    "limit": limits.ml_insights_per_week,
-                    "remaining": limits.ml_insights_per_week - usage.ml_insights_used
-                }
+                used = getattr(usage, counter)
+                usage_info = {"used": used, "limit": limit, "remaining": limit - used}
+                if used >= limit:
+                    return UsageDecision(False, f"Weekly limit of {limit} {label} reached", subscription.tier, usage_info)
+                return UsageDecision(True, None, subscription.tier, usage_info)
 
-        return result
+        return UsageDecision(True, None, subscription.tier)
 
     @staticmethod
     async def get_current_usage(user_id: str) -> UsageTracking:
         """Get current period usage for user"""
         db = await get_database()
-        subscription = await SubscriptionService.get_user_subscription(user_id)
+        subscription = await SubscriptionService.get_cached_subscription(user_id)
 
         # Calculate current week period (Monday to Sunday)
         now = datetime.utcnow()
@@ -241,8 +253,6 @@ class SubscriptionService:
         })
 
         if usage_doc:
-            if "_id" in usage_doc:
-                usage_doc["_id"] = str(usage_doc["_id"])
             return UsageTracking(**usage_doc)
 
         # Create new usage tracking record
@@ -250,55 +260,109 @@ class SubscriptionService:
             user_id=user_id,
             subscription_id=subscription.id,
             period_start=period_start,
-            period_end=period_end
+            period_end=period_end,
+            created_at=now,
+            updated_at=now
         )
 
-        await db.usage_tracking.insert_one(usage.dict())
+        await db.usage_tracking.insert_one(usage.model_dump())
         return usage
 
     @staticmethod
-    async def record_usage(user_id: str, feature: str, amount: int = 1) -> bool:
-        """Record feature usage for billing and limits"""
+    async def consume_usage(user_id: str, feature: str, amount: int = 1) -> UsageDecision:
+        """Check the limit and record usage in a single atomic update"""
         db = await get_database()
-        usage = await SubscriptionService.get_current_usage(user_id)
+        subscription = await SubscriptionService.get_cached_subscription(user_id)
+        limits = TIER_LIMITS[subscription.tier]
 
-        update_data = {"updated_at": datetime.utcnow()}
+        if feature in _GATED_FEATURES:
+            flag, reason = _GATED_FEATURES[feature]
+            if not getattr(limits, flag):
+                return UsageDecision(False, reason, subscription.tier)
 
-        if feature == "simulation":
-            update_data["simulations_used"] = usage.simulations_used + amount
-        elif feature == "risk_assessment":
-            update_data["risk_assessments_used"] = usage.risk_assessments_used + amount
-        elif feature == "ml_prediction":
-            update_data["ml_predictions_used"] = usage.ml_predictions_used + amount
-        elif feature == "ml_insights":
-            update_data["ml_insights_used"] = usage.ml_insights_used + amount
+        if feature in _METERED_FEATURES:
+            counter, limit_attr, label = _METERED_FEATURES[feature]
+            limit = getattr(limits, limit_attr)
         else:
-            # Update features_used dictionary
-            features_used = usage.features_used.copy()
-            features_used[feature] = features_used.get(feature, 0) + amount
-            update_data["features_used"] = features_used
+            counter, limit, label = f"features_used.{feature}", None, feature
 
-        await db.usage_tracking.update_one(
-            {"user_id": user_id, "id": usage.id},
-            {"$set": update_data}
+        now = datetime.utcnow()
+        query = {
+            "user_id": user_id,
+            "subscription_id": subscription.id,
+            "period_start": {"$lte": now},
+            "period_end": {"$gt": now}
+        }
+        if limit is not None:
+            # Only match while there is room left, so check + increment is one op
+            query[counter] = {"$lte": limit - amount}
+
+        update = {"$inc": {counter: amount}, "$set": {"updated_at": now}}
+
+        usage_doc = await db.usage_tracking.find_one_and_update(
+            query, update, return_document=ReturnDocument.AFTER
         )
+        _analytics_cache.pop(user_id, None)
+        if usage_doc is None:
+            # Either no record exists for this period yet, or the limit is reached
+            usage = await SubscriptionService.get_current_usage(user_id)
+            usage_doc = await db.usage_tracking.find_one_and_update(
+                query, update, return_document=ReturnDocument.AFTER
+            )
+            if usage_doc is None and limit is not None:
+                used = getattr(usage, counter, 0)
+                usage_info = {"used": used, "limit": limit, "remaining": max(0, limit - used)}
+                return UsageDecision(False, f"Weekly limit of {limit} {label} reached", subscription.tier, usage_info)
+
+        if limit is None:
+            return UsageDecision(True, None, subscription.tier)
+
+        used = usage_doc.get(counter, 0)
+        return UsageDecision(True, None, subscription.tier, {"used": used, "limit": limit, "remaining": limit - used})
 
-        return True
+    @staticmethod
+    async def release_usage(user_id: str, feature: str, amount: int = 1) -> None:
+        """Give back usage consumed by a request that failed"""
+        db = await get_database()
+        subscription = await SubscriptionService.get_cached_subscription(user_id)
+
+        if feature in _METERED_FEATURES:
+            counter = _METERED_FEATURES[feature][0]
+        else:
+            counter = f"features_used.{feature}"
+
+        now = datetime.utcnow()
+        await db.usage_tracking.update_one(
+            {
+                "user_id": user_id,
+                "subscription_id": subscription.id,
+                "period_start": {"$lte": now},
+                "period_end": {"$gt": now},
+                counter: {"$gte": amount}
+            },
+            {"$inc": {counter: -amount}, "$set": {"updated_at": now}}
+        )
+        _analytics_cache.pop(user_id, None)
 
     @staticmethod
     async def get_subscription_analytics(user_id: str) -> Dict[str, Any]:
         """Get subscription and usage analytics for user"""
-        subscription = await SubscriptionService.get_user_subscription(user_id)
+        entry = _analytics_cache.get(user_id)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+
+        subscription = await SubscriptionService.get_cached_subscription(user_id)
         usage = await SubscriptionService.get_current_usage(user_id)
         limits = TIER_LIMITS[subscription.tier]
+        now = datetime.utcnow()
 
-        return {
+        analytics = {
             "subscription": {
                 "tier": subscription.tier,
                 "status": subscription.status,
-                "is_active": subscription.is_active(),
-                "is_trial": subscription.is_trial(),
-                "days_until_expiry": subscription.days_until_expiry(),
+                "is_active": subscription.is_active(now),
+                "is_trial": subscription.is_trial(now),
+                "days_until_expiry": subscription.days_until_expiry(now),
                 "billing_period": subscription.billing_period
             },
             "usage": {
@@ -322,4 +386,9 @@ class SubscriptionService:
                 "custom_scenarios": limits.custom_scenarios,
                 "historical_data_months": limits.historical_data_months
             }
-        }
\ No newline at end of file
+        }
+
+        if len(_analytics_cache) >= _SUBSCRIPTION_CACHE_MAX_SIZE:
+            _analytics_cache.clear()
+        _analytics_cache[user_id] = (analytics, time.monotonic() + _ANALYTICS_CACHE_TTL)
+        return analytics
\ No newline at end of file
@@ -4,6 +4,7 @@ Tests for ML Pipeline
 Run with: pytest tests/test_ml_pipeline.py -v
 """
 
+import numpy as np
 import pytest
 from datetime import datetime
 
@@ -12,7 +13,7 @@ from models.ml_models import (
     CareerMetrics, LifeQualityMetrics, YearlyPrediction
 )
 from ml.feature_engineering import FeatureEngineer
-from ml.prediction_service import MLPredictionService
+from ml.prediction_service import MLPredictionService, _round_each
 from services.ml_integration_service import MLIntegrationService
 from models.simulation import UserContext
 
@@ -105,6 +106,29 @@ class TestFeatureEngineering:
         assert 0.0 <= prob <= 1.0, "Probability should be between 0 and 1"
         assert prob > 0.1, "With good performance and time, should have promotion chance"
 
+    def test_promotion_probability_table_matches_scalar(self):
+        """Test that the tabulated promotion probabilities equal the scalar ones"""
+        input_data = MLPredictionInput(
+            age=40,
+            education_level=EducationLevel.MASTERS,
+            years_experience=15,
+            career_field=CareerField.FINANCE,
+            position_level="senior",
+            location_type=LocationType.SUBURB,
+            industry_growth_rate=0.12
+        )
+
+        performance_scores = [4.0, 6.3, 7.0, 8.85, 10.0]
+        base_prob, growth_factor = FeatureEngineer.promotion_factors(input_data)
+        table = FeatureEngineer.promotion_probability_table(base_prob, growth_factor, performance_scores)
+
+        for row, performance in enumerate(performance_scores):
+            for years_in_position in range(8):
+                expected = FeatureEngineer.calculate_promotion_probability(
+                    input_data, years_in_position, performance
+                )
+                assert table[row, min(years_in_position, 5)] == expected
+
     def test_financial_security(self):
         """Test financial security calculation"""
         security_high = FeatureEngineer.calculate_financial_security(
@@ -123,6 +147,49 @@ class TestFeatureEngineering:
         assert security_high > 7.0, "120k salary should provide high security"
         assert security_low < 6.0, "35k in major city should have lower security"
 
+    def test_batch_features_match_scalar(self):
+        """Test that batch scoring matches the per-record methods"""
+        inputs = [
+            MLPredictionInput(
+                age=25,
+                education_level=EducationLevel.BACHELORS,
+                years_experience=2,
+                career_field=CareerField.TECHNOLOGY,
+                position_level="entry",
+                location_type=LocationType.MAJOR_CITY,
+                has_remote_option=True
+            ),
+            MLPredictionInput(
+                age=40,
+                education_level=EducationLevel.PHD,
+                years_experience=12,
+                current_salary=150000,
+                career_field=CareerField.HEALTHCARE,
+                position_level="lead",
+                location_type=LocationType.RURAL,
+                is_career_change=True,
+                detected_profession="doctor"
+            ),
+        ]
+
+        batch = FeatureEngineer.batch_features(inputs)
+
+        for i, input_data in enumerate(inputs):
+            balance = FeatureEngineer.calculate_work_life_balance(input_data)
+            salary = FeatureEngineer.calculate_base_salary(input_data)
+
+            assert batch["base_salary"][i] == pytest.approx(salary)
+            assert batch["work_life_balance"][i] == pytest.approx(balance)
+            assert batch["career_stability"][i] == pytest.approx(
+                FeatureEngineer.calculate_career_stability(input_data)
+            )
+            assert batch["stress_level"][i] == pytest.approx(
+                FeatureEngineer.calculate_stress_level(input_data, balance)
+            )
+            assert batch["financial_security"][i] == pytest.approx(
+                FeatureEngineer.calculate_financial_security(salary, input_data.age, input_data.location_type)
+            )
+
 
 class TestMLPredictionService:
     """Test ML prediction service"""
@@ -191,6 +258,82 @@ class TestMLPredictionService:
             assert 1.0 <= lq.relationship_quality <= 10.0
             assert 1.0 <= lq.personal_growth <= 10.0
 
+    def test_seeded_timeline_is_reproducible(self):
+        """Test that services with the same seed produce the same timeline"""
+        input_data = MLPredictionInput(
+            age=27,
+            education_level=EducationLevel.BACHELORS,
+            years_experience=3,
+            career_field=CareerField.BUSINESS,
+            position_level="entry",
+            location_type=LocationType.SUBURB
+        )
+
+        first = MLPredictionService(seed=42).predict_timeline(input_data, years=10, start_year=2025)
+        second = MLPredictionService(seed=42).predict_timeline(input_data, years=10, start_year=2025)
+
+        assert first.predictions == second.predictions
+
+    def test_metric_rounding_matches_round_at_boundaries(self):
+        """Test that vectorized metric rounding agrees with Python's round()"""
+        promotion = np.array([0.2705, 0.1235, 0.0005])
+        scores = np.array([[0.15, 2.675], [8.45, 1.05]])
+
+        assert _round_each(promotion, 3).tolist() == [round(v, 3) for v in promotion.tolist()]
+        assert _round_each(scores, 1).tolist() == [[round(v, 1) for v in row] for row in scores.tolist()]
+        assert _round_each(promotion, 3)[0] == 0.271
+
+    def test_repeated_input_is_served_from_cache(self):
+        """Test that an identical resubmission returns the cached timeline"""
+        service = MLPredictionService()
+
+        def make_input():
+            return MLPredictionInput(
+                age=35,
+                education_level=EducationLevel.MASTERS,
+                years_experience=10,
+                career_field=CareerField.FINANCE,
+                position_level="senior",
+                location_type=LocationType.MAJOR_CITY
+            )
+
+        first = service.predict_timeline(make_input(), years=5, start_year=2025)
+        second = service.predict_timeline(make_input(), years=5, start_year=2025)
+
+        assert first.predictions == second.predictions
+        assert first is not second
+
+    def test_unvalidated_predictions_pass_validation(self):
+        """Test that metrics are clamped upstream of the unvalidated model build"""
+        service = MLPredictionService(seed=7)
+
+        extremes = [
+            MLPredictionInput(
+                age=18,
+                education_level=EducationLevel.HIGH_SCHOOL,
+                years_experience=0,
+                career_field=CareerField.CREATIVE,
+                position_level="entry",
+                location_type=LocationType.RURAL,
+                is_career_change=True,
+                is_location_change=True
+            ),
+            MLPredictionInput(
+                age=60,
+                education_level=EducationLevel.PHD,
+                years_experience=35,
+                career_field=CareerField.TECHNOLOGY,
+                position_level="executive",
+                location_type=LocationType.MAJOR_CITY,
+                industry_growth_rate=0.2
+            ),
+        ]
+
+        for input_data in extremes:
+            result = service.predict_timeline(input_data, years=10, start_year=2025)
+            for pred in result.predictions:
+                assert YearlyPrediction.model_validate(pred.model_dump()) == pred
+
     def test_career_change_impact(self):
         """Test that career changes affect predictions"""
         service = MLPredictionService()
@@ -0,0 +1,90 @@
+"""
+Tests for payment status polling
+
+Run with: pytest tests/test_payment_status.py -v
+"""
+
+import asyncio
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+import routes.payments as payments
+from services.subscription_service import SubscriptionService
+
+
+class TestPaymentStatus:
+    """Test the upgrade claim in get_payment_status"""
+
+    @pytest.fixture
+    def db(self, monkeypatch):
+        db = mongomock_motor.AsyncMongoMockClient()["parallax_test"]
+
+        async def get_database():
+            return db
+
+        async def get_stripe_payment_status(session_id):
+            # Yield so concurrent polls reach the claim together
+            await asyncio.sleep(0.01)
+            return {"payment_status": "paid", "amount_total": 499, "currency": "usd", "customer": "cus_1"}
+
+        monkeypatch.setattr(payments, "get_database", get_database)
+        monkeypatch.setattr(payments, "get_stripe_payment_status", get_stripe_payment_status)
+        return db
+
+    def _insert_transaction(self, db):
+        transaction = payments.PaymentTransaction(
+            user_id="user_1",
+            session_id="cs_1",
+            amount=4.99,
+            payment_status="initiated",
+            package_type="premium_monthly"
+        )
+        asyncio.run(db.payment_transactions.insert_one(transaction.model_dump()))
+
+    def test_concurrent_polls_upgrade_once(self, db, monkeypatch):
+        """Test that two simultaneous polls of a paid session upgrade the user once"""
+        upgrades = []
+
+        async def upgrade_to_premium(**kwargs):
+            upgrades.append(kwargs["user_id"])
+            await asyncio.sleep(0.01)
+
+        monkeypatch.setattr(SubscriptionService, "upgrade_to_premium", staticmethod(upgrade_to_premium))
+        self._insert_transaction(db)
+
+        async def poll_twice():
+            return await asyncio.gather(
+                payments.get_payment_status("cs_1"),
+                payments.get_payment_status("cs_1")
+            )
+
+        results = asyncio.run(poll_twice())
+
+        assert all(result["payment_status"] == "paid" for result in results)
+        assert upgrades == ["user_1"]
+        transaction = asyncio.run(db.payment_transactions.find_one({"session_id": "cs_1"}))
+        assert transaction["completed_at"] is not None
+
+    def test_failed_upgrade_is_retried(self, db, monkeypatch):
+        """Test that a failed upgrade releases the claim for the next poll"""
+        upgrades = []
+
+        async def upgrade_to_premium(**kwargs):
+            upgrades.append(kwargs["user_id"])
+            if len(upgrades) == 1:
+                raise RuntimeError("database unavailable")
+
+        monkeypatch.setattr(SubscriptionService, "upgrade_to_premium", staticmethod(upgrade_to_premium))
+        self._insert_transaction(db)
+
+        with pytest.raises(payments.HTTPException):
+            asyncio.run(payments.get_payment_status("cs_1"))
+        asyncio.run(payments.get_payment_status("cs_1"))
+        asyncio.run(payments.get_payment_status("cs_1"))
+
+        assert upgrades == ["user_1", "user_1"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
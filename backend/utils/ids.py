@@ -0,0 +1,37 @@
+"""
+Opaque record ids.
+
+Ids are 128 random bits rendered as 32 hex characters. Random bytes are
+read from os.urandom in blocks and handed out 16 at a time, so creating a
+model costs a slice of a buffer instead of a syscall per id.
+"""
+
+import os
+import threading
+
+_ID_BYTES = 16
+_REFILL_BYTES = 4096
+
+_buf = bytearray()
+_lock = threading.Lock()
+
+
+def new_id() -> str:
+    """Return a new random 32-character hex id"""
+    with _lock:
+        if len(_buf) < _ID_BYTES:
+            _buf.extend(os.urandom(_REFILL_BYTES))
+        raw = bytes(_buf[-_ID_BYTES:])
+        del _buf[-_ID_BYTES:]
+    return raw.hex()
+
+
+def _reset_after_fork() -> None:
+    # A forked worker must not hand out the same ids as its parent
+    global _lock
+    _lock = threading.Lock()
+    _buf.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)